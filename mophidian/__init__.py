@@ -3,16 +3,43 @@ __version__ = "0.2.4"
 from dataclasses import dataclass
 from pathlib import Path
 
-from .config import CONFIG
+
+class _Dev:
+    def __get__(self, obj, owner) -> str:
+        from .config import CONFIG
+
+        return Path("dist").joinpath(CONFIG.site.root).as_posix()
+
 
 @dataclass
 class DestState:
     PREVIEW = "out"
     """Serve files from out folder."""
-    DEV = Path("dist").joinpath(CONFIG.site.root).as_posix()
+    DEV = _Dev()
     """Serve files from dist folder."""
 
-states = {
+
+class _States(dict):
+    """Shared state. The destination defaults to the dev server's directory, which is only
+    resolved from the config when it is first used.
+    """
+
+    def __missing__(self, key: str):
+        if key == "dest":
+            self[key] = DestState.DEV
+            return self[key]
+        raise KeyError(key)
+
+
+states = _States({
     "markdown_code_highlight_warned": False,
-    "dest": DestState.DEV
-}
+})
+
+
+def __getattr__(name: str):
+    # The config, and the modules it needs, are only imported when it is used
+    if name == "CONFIG":
+        from .config import CONFIG
+
+        return CONFIG
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
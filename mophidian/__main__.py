@@ -4,24 +4,21 @@ from pathlib import Path
 from shutil import rmtree
 import socket
 from time import sleep
+from typing import TYPE_CHECKING
 import click
 
-from watchserver import LiveServer
-from saimll import SAIML, Logger, LogLevel, style
-
-from mophidian import states, DestState, __version__
-from mophidian.cli.styles import generate_highlight
-from mophidian.config import CONFIG
-from mophidian.core import (
-    build as full_build,
-    generate_sitemaps,
-    generate_rss,
-    Callbacks,
-)
+# Only what the cli needs to parse arguments is imported up front. Each command imports the
+# config, server, and build stack it uses so that commands like `--version` start quickly.
+from mophidian import __version__
+
+if TYPE_CHECKING:
+    from watchserver import LiveServer
 
 
 def server_start(server: LiveServer, expose: bool = False):
     """Start a server and print the started message with hosts."""
+    from saimll import SAIML, Logger, style
+
     # Get port and network information
     socket_server = server.server_thread.server
     IPHostName = socket.gethostname()
@@ -57,6 +54,8 @@ def server_start(server: LiveServer, expose: bool = False):
 
 def server_shutdown(server: LiveServer):
     """Shutdown a server and print the shutdown message."""
+    from saimll import Logger, style
+
     Logger.Custom(
         style("Mophidian", fg="white", bg=(166, 218, 149)),
         "Shutting down...",
@@ -90,6 +89,19 @@ def cli(version: bool = False):
 
 
 @click.option("--debug", flag_value=True, help="Enable debug logs", default=False)
+@click.option(
+    "-j",
+    "--jobs",
+    type=int,
+    help="Number of worker processes to render pages with. Use 0 for one per cpu",
+    default=1,
+)
+@click.option(
+    "--no-cache",
+    flag_value=True,
+    help="Render every page instead of using the persistent render cache",
+    default=False,
+)
 @click.option(
     "--dirty",
     flag_value=True,
@@ -97,10 +109,15 @@ def cli(version: bool = False):
     default=False,
 )
 @cli.command(
-    name="build", help=f"Compile and build the website to {CONFIG.site.dest!r}"
+    name="build", help="Compile and build the website to the configured dest directory"
 )
-def build_command(debug: bool, dirty: bool):
+def build_command(debug: bool, dirty: bool, jobs: int, no_cache: bool):
     """Build the website in the specified dest directory."""
+    from saimll import Logger, LogLevel
+
+    from mophidian import states, DestState
+    from mophidian.config import CONFIG
+    from mophidian.core import build as full_build, generate_sitemaps, generate_rss
 
     if debug:
         Logger.level(LogLevel.DEBUG)
@@ -109,7 +126,11 @@ def build_command(debug: bool, dirty: bool):
         rmtree("out/")
 
     states["dest"] = DestState.PREVIEW
-    file_system, _, _, _ = full_build(dirty=dirty)
+    file_system, _, _, _ = full_build(
+        dirty=dirty,
+        jobs=jobs,
+        cache=CONFIG.build.cache.enabled and not no_cache,
+    )
 
     if CONFIG.build.sitemap.enabled:
         generate_sitemaps(file_system)
@@ -126,6 +147,8 @@ def code_highlight(style: str):
     """Stylize markdown code blocks with pygmentize. This command allows you to generate the
     CSS file with a given styles highlight colors.
     """
+    from mophidian.cli.styles import generate_highlight
+
     generate_highlight(style)
 
 
@@ -149,6 +172,9 @@ def new(force: bool, preset: bool, name: str):
     """Stylize markdown code blocks with pygmentize. This command allows you to generate the
     CSS file with a given styles highlight colors.
     """
+    from saimll import SAIML, Logger
+
+    from mophidian.config import CONFIG
 
     while name == "":
         name = input("Enter the name of your project: ")
@@ -212,18 +238,26 @@ def new(force: bool, preset: bool, name: str):
 @cli.command(name="dev")
 def dev(open: bool, host: bool, debug: bool = False):
     """Serve the site; when files change, rebuild the site and reload the server."""
+    from saimll import Logger, LogLevel
+    from watchserver import LiveServer
+
+    from mophidian.config import CONFIG
+    from mophidian.core import Callbacks
 
     if debug:
         Logger.level(LogLevel.DEBUG)
 
+    callbacks = Callbacks()
     server = LiveServer(
         watch=[CONFIG.site.source, CONFIG.site.public, CONFIG.site.components],
         root="dist",
         errors=CONFIG.site.root,
         auto_open=CONFIG.site.root if open else None,
         suppress=True,
-        live_callback=Callbacks(),
+        live_callback=callbacks,
     )
+    # Batches of file events are rendered after the watcher's callbacks return
+    callbacks.reloads = server.reloads
 
     run_server(server, host)
     rmtree("dist", ignore_errors=True)
@@ -247,6 +281,9 @@ def preview(open: bool, host: bool):
     """Preview the project. This includes building to the websites root and launching a server.
     There are no live updates, to get that use `moph serve`.
     """
+    from watchserver import LiveServer
+
+    from mophidian.config import CONFIG
 
     server = LiveServer(
         watch=["dist/"],
@@ -4,7 +4,17 @@ from typing import Literal
 
 from tcfg import Path, cfg
 
-__all__ = ["Pygmentize", "MarkdownWrapper", "Markdown", "Site", "Build", "Config"]
+__all__ = [
+    "Pygmentize",
+    "MarkdownWrapper",
+    "Markdown",
+    "Site",
+    "Cache",
+    "Build",
+    "Config",
+    "LazyConfig",
+    "load_config",
+]
 
 default_extensions = {
     "abbr",
@@ -136,6 +146,25 @@ class Site(cfg):
 
     public: str = Path("public/")
 
+    ignore: list[str] = [
+        ".git",
+        ".hg",
+        ".svn",
+        "node_modules",
+        "__pycache__",
+        ".DS_Store",
+        "Thumbs.db",
+        "*.swp",
+        "*.swo",
+        "*~",
+        ".#*",
+        "#*#",
+    ]
+    """Globs of files and directories to skip while discovering pages, components,
+    and static files. Globs are matched against the name and the path relative to
+    the directory being discovered.
+    """
+
     dest: str = Path("out/")
     """The directory to put the built files into. Defaults to `site/`"""
 
@@ -206,6 +235,21 @@ class Sitemap(cfg):
     """
 
 
+class Cache(cfg):
+    """Mophidian.build.cache configuration."""
+
+    enabled: bool = True
+    """Toggle the persistent render cache used by `moph build`."""
+
+    path: str = Path(".moph-cache/")
+    """Directory to store the cache in."""
+
+    max_size: int = 256
+    """Max size of the cache in megabytes. The least recently used entries are
+    removed first when the cache grows past this size.
+    """
+
+
 class Build(cfg):
     """Mohpidian.build configuration."""
 
@@ -214,12 +258,26 @@ class Build(cfg):
     is detected. Defaults to `2.0`.
     """
 
+    batch_delay: float = 0.2
+    """The delay, in seconds, after the last file change before the live server rebuilds.
+    Changes made during the delay are rebuilt together. Defaults to `0.2`.
+    """
+
     sitemap: Sitemap
     """Mophidian.build.sitemap configuration"""
 
     rss: RSS
     """Mophidian.build.rss configuration"""
 
+    cache: Cache
+    """Mophidian.build.cache configuration"""
+
+    static_mode: Literal["copy", "hardlink", "reflink", "symlink"] = "copy"
+    """How static files are placed in `dist/` while running `moph dev`. Linking
+    avoids physically copying large static files on every build. `moph build`
+    always copies. Defaults to `copy`.
+    """
+
     favicon: str = Path("/favicon.ico")
     """Path to the favicon from website root."""
 
@@ -247,13 +305,42 @@ class Config(cfg):
     data: str = "\x1b[33m"
 
 
-CONFIG = Config()
+def load_config() -> Config:
+    """Load the config from `moph.yml` and merge in the default markdown extensions."""
+
+    config = Config()
+
+    if config.markdown.extensions != default_extensions:
+        for extension in config.markdown.extensions:
+            default_extensions.add(extension)
+        config.markdown.extensions = list(default_extensions)
+
+    if config.markdown.extension_configs != default_extension_configs:
+        default_extension_configs.update(config.markdown.extension_configs)
+        config.markdown.extension_configs = default_extension_configs
+
+    return config
+
+
+class LazyConfig:
+    """Proxy to the config that is only loaded, from `moph.yml`, when it is first used."""
+
+    def __init__(self) -> None:
+        object.__setattr__(self, "_config", None)
+
+    def _load(self) -> Config:
+        if self._config is None:
+            object.__setattr__(self, "_config", load_config())
+        return self._config
+
+    def __getattr__(self, name: str):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name: str, value):
+        setattr(self._load(), name, value)
+
+    def __repr__(self) -> str:
+        return repr(self._load())
 
-if CONFIG.markdown.extensions != default_extensions:
-    for extension in CONFIG.markdown.extensions:
-        default_extensions.add(extension)
-    CONFIG.markdown.extensions = list(default_extensions)
 
-if CONFIG.markdown.extension_configs != default_extension_configs:
-    default_extension_configs.update(CONFIG.markdown.extension_configs)
-    CONFIG.markdown.extension_configs = default_extension_configs
+CONFIG: Config = LazyConfig()  # type: ignore[assignment]
@@ -1,50 +1,93 @@
 from saimll import SAIML, Logger
-from phml import PHML
 
-from mophidian import CONFIG, states
-from mophidian.core.util import filter_sort
-from .context import Mophidian
+from mophidian import states
+from mophidian.core.cache import HighlightCache, MarkdownCache, RenderCache
+from mophidian.core.markdown import HIGHLIGHTER, MARKDOWN_POOL
+from mophidian.file_system import StaticMode
 from .construct import *
+from .dependencies import *
+from .manifest import *
 from .render import *
 
 __all__ = [
     "build",
     "render_pages",
     "write_static_files",
+    "Manifest",
+    "DependencyGraph",
     "generate_sitemaps",
     "generate_rss",
 ]
 
 
-def build(dirty: bool = False):
-    """Take the components and files and render and write them to the given output directory."""
+def build(
+    dirty: bool = False,
+    jobs: int = 1,
+    cache: bool = False,
+    static_mode: str = StaticMode.COPY,
+):
+    """Take the components and files and render and write them to the given output directory.
 
-    Logger.Debug("Building pages")
-
-    # ? Init phml parser/compiler with globally exposed variables
-    phml = PHML()
-    phml.expose(mophidian=Mophidian(), filter_sort=filter_sort)
+    Args:
+        dirty (bool): Force write files even if the rendered file already exists.
+        jobs (int): Number of worker processes used to render pages.
+        cache (bool): Use the persistent render, markdown, and highlight caches to skip
+            rendering unchanged pages, converting unchanged markdown, and highlighting unchanged
+            code.
+        static_mode (str): How static files are placed in the output directory.
+    """
 
+    Logger.Debug("Building pages")
     Logger.Debug("Discovering files and components")
 
     # ? Discover all files and build nav
-    components = construct_components(CONFIG.site.components)
-    file_system, nav = construct_file_system(CONFIG.site.source)
-    public = construct_static(CONFIG.site.public)
+    file_system, nav, public, components = discover()
 
-    # ? Add components to phml compiler
-    phml.add(
-        *[(cmpt.cname, cmpt.full_path) for cmpt in components.components()],
-        strip=CONFIG.site.components,
-    )  # type: ignore
+    # ? Init phml parser/compiler with globally exposed variables and components
+    phml = create_compiler(components)
 
     # ? Render all the pages
     dest = states["dest"]
+    manifest = Manifest(dest)
     Logger.Debug(f"Rendering pages to {SAIML.parse(f'[@F yellow $]{dest}')}")
     Logger.Debug(f"\n{file_system}")
 
-    render_pages(file_system, public, components, nav=nav, out=dest, phml=phml, dirty=dirty)
-    write_static_files(file_system, public, out=dest, dirty=dirty)
+    # Markdown conversions and highlighted code are cached separately so edited pages still
+    # reuse them
+    markdown_cache = MarkdownCache() if cache else None
+    highlight_cache = HighlightCache() if cache else None
+    MARKDOWN_POOL.cache = markdown_cache
+    HIGHLIGHTER.cache = highlight_cache
+    try:
+        render_pages(
+            file_system,
+            public,
+            components,
+            nav=nav,
+            out=dest,
+            phml=phml,
+            dirty=dirty,
+            jobs=jobs,
+            cache=RenderCache(file_system, public, components) if cache else None,
+            manifest=manifest,
+        )
+    finally:
+        MARKDOWN_POOL.cache = None
+        HIGHLIGHTER.cache = None
+
+    for content_cache in [markdown_cache, highlight_cache]:
+        if content_cache is not None:
+            Logger.Info(content_cache.report())
+    Logger.Debug(f"Reused {HIGHLIGHTER.memory_hits} highlighted code blocks from memory")
+    write_static_files(
+        file_system, public, out=dest, dirty=dirty, manifest=manifest, mode=static_mode
+    )
+
+    # Remove output from previous builds that no longer has a source file
+    for orphan in manifest.prune():
+        Logger.Debug(f"Removed orphaned output {SAIML.parse(f'[@F yellow $]{orphan}')}")
+    manifest.save()
+    Logger.Debug(f"{len(manifest.changed)} changed files listed in {manifest.path.as_posix()!r}")
 
     Logger.Debug("Finished building pages")
     return file_system, public, components, phml
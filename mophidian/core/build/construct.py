@@ -1,16 +1,31 @@
+from __future__ import annotations
+from fnmatch import fnmatch
+import os
 from re import match
 from pathlib import Path
 import time
+from typing import Callable, Iterator
 
 from saimll import SAIML, Logger
 from phml.core import PHML, Formats
 
 from mophidian import CONFIG
-from mophidian.file_system import Directory, Component, Nav, Static, Layout, Page, Markdown, Renderable
+from mophidian.file_system import (
+    Directory,
+    Component,
+    File,
+    Nav,
+    Static,
+    Layout,
+    Page,
+    Markdown,
+    Renderable,
+)
 from mophidian.core.util import REGEX, PAGE_IGNORE
 from datetime import datetime
 
 __all__ = [
+    "walk",
     "construct_components",
     "construct_static",
     "construct_file_system",
@@ -53,60 +68,147 @@ class RSSItem:
     def __repr__(self) -> str:
         return f"RSSItem(title: {self.title!r}, url: {self.url!r}, pubDate: {self.pub_date})"
 
+def is_ignored(name: str, relative: str, ignore: list[str]) -> bool:
+    """Check if a file or directory matches any of the ignore globs. Globs are matched
+    against the entries name and it's path relative to the discovery root.
+    """
+    return any(fnmatch(name, pattern) or fnmatch(relative, pattern) for pattern in ignore)
+
+
+def is_ignored_relative(relative: str, ignore: list[str] | None = None) -> bool:
+    """Check if a path relative to a discovery root is skipped by `walk`, either by itself or
+    through one of the directories leading to it. `ignore` defaults to the `site.ignore` config.
+    """
+
+    ignore = CONFIG.site.ignore if ignore is None else ignore
+    parts = relative.strip("/").split("/")
+    return any(
+        is_ignored(part, "/".join(parts[: index + 1]), ignore) for index, part in enumerate(parts)
+    )
+
+
+def walk(
+    path: str,
+    classify: Callable[[str, str], File | None],
+    ignore: list[str] | None = None,
+) -> Iterator[File]:
+    """Walk a directory in a single pass with `os.scandir` and classify each file.
+
+    Files in a directory are visited, in sorted order, before it's sub directories.
+    Ignored directories are never descended into.
+
+    Args:
+        path (str): The root directory to walk.
+        classify (Callable): Given the files posix path and it's name, returns the file
+            system object for the file or None if the file should be skipped.
+        ignore (list[str] | None): Globs of files and directories to ignore. Defaults to
+            the `site.ignore` config.
+
+    Yields:
+        File: The classified files.
+    """
+
+    ignore = CONFIG.site.ignore if ignore is None else ignore
+    root = path.replace("\\", "/").rstrip("/")
+    visited = set()
+
+    def scan(directory: str, relative: str) -> Iterator[File]:
+        try:
+            with os.scandir(directory) as entries:
+                entries = sorted(entries, key=lambda e: e.name)
+        except OSError:
+            return
+
+        directories = []
+        for entry in entries:
+            rel = f"{relative}/{entry.name}".lstrip("/")
+            if is_ignored(entry.name, rel, ignore):
+                continue
+
+            if entry.is_dir():
+                directories.append((entry, rel))
+            elif entry.is_file():
+                file = classify(f"{directory}/{entry.name}", entry.name)
+                if file is not None:
+                    yield file
+
+        for entry, rel in directories:
+            # Guard against symlinked directory cycles
+            stat = entry.stat()
+            if (stat.st_dev, stat.st_ino) not in visited:
+                visited.add((stat.st_dev, stat.st_ino))
+                yield from scan(f"{directory}/{entry.name}", rel)
+
+    if Path(root).is_dir():
+        yield from scan(root, "")
+
+
 def construct_components(path: str) -> Directory:
     """Find all the components in the given path and construct a file structure."""
 
+    def classify(file: str, name: str) -> File | None:
+        if name.endswith(".phml"):
+            return Component(file, path)
+
+        suffix = Path(name).suffix
+        suggestion = f"{SAIML.parse(f'[@Fred]{suffix}')} to {SAIML.parse('[@Fgreen].phml')}"
+        Logger.Debug(
+            "Invalid component:",
+            f"{SAIML.parse(f'[@Fyellow]{SAIML.escape(file)}')}.",
+            "Try changing",
+            suggestion,
+            label="Debug.[@Fred]Error[@]"
+        )
+        return None
+
     components = Directory(path)
-    for file in Path(path).glob("**/*.*"):
-        if file.suffix == ".phml":
-            components.add(Component(file.as_posix(), path))
-        else:
-            suggestion = f"{SAIML.parse(f'[@Fred]{file.suffix}')} to {SAIML.parse('[@Fgreen].phml')}"
-            Logger.Debug(
-                "Invalid component:",
-                f"{SAIML.parse(f'[@Fyellow]{SAIML.escape(file.as_posix())}')}.",
-                "Try changing",
-                suggestion,
-                label="Debug.[@Fred]Error[@]"
-            )
+    for component in walk(path, classify):
+        components.add(component)
     return components
 
 def construct_static(path: str) -> Directory:
     """Find all the static files in the given path and construct a file structure."""
 
     static_files = Directory(path)
-    for file in Path(path).glob("**/*.*"):
-        static_files.add(Static(file.as_posix(), path))
+    for file in walk(path, lambda file, _: Static(file, path)):
+        static_files.add(file)
 
     return static_files
 
+def classify_page(file: str, name: str, path: str) -> File | None:
+    """Classify a file in the pages directory as a Layout, Page, Markdown, or Static file."""
+
+    suffix = Path(name).suffix
+
+    # Pages and Layouts
+    if suffix == ".phml":
+        if REGEX["layout"]["name"].match(name) is not None:
+            return Layout(file, path)
+        if REGEX["page"]["name"].match(name) is not None:
+            return Page(file, path)
+
+        file_info = REGEX["file"]["name"].search(name)
+        file_name, _, _, _ = (
+            file_info.groups() if file_info is not None else ("", None, None, "")
+        )
+        if file_name in PAGE_IGNORE:
+            return Page(file, path)
+        return None
+
+    # Markdown files
+    if suffix in [".md", ".mdx"]:
+        return Markdown(file, path)
+
+    # Static files
+    return Static(file, path)
+
 def construct_file_system(path: str) -> tuple[Directory, Nav]:
     """Find all the files in the given path and construct a file structure."""
 
     Logger.Debug("Generating file system from path:", path.lstrip('/'))
     root = Directory(path)
-    for _file in Path(path).glob("**/*.*"):
-        # Pages and Layouts
-        if _file.suffix == ".phml":
-            if REGEX["layout"]["name"].match(_file.name) is not None:
-                root.add(Layout(_file.as_posix(), path))
-            elif REGEX["page"]["name"].match(_file.name) is not None:
-                root.add(Page(_file.as_posix(), path))
-            else:
-                file_info = REGEX["file"]["name"].search(_file.name)
-                file_name, _, _, _ = (
-                    file_info.groups() if file_info is not None else ("", None, None, "")
-                )
-                if file_name in PAGE_IGNORE:
-                    root.add(Page(_file.as_posix(), path))
-
-        # Markdown files
-        elif _file.suffix in [".md", ".mdx"]:
-            root.add(Markdown(_file.as_posix(), path))
-
-        # Static files
-        else:
-            root.add(Static(_file.as_posix(), path))
+    for file in walk(path, lambda file, name: classify_page(file, name, path)):
+        root.add(file)
 
     root.build_hierarchy()
     nav = root.build_nav()
@@ -150,10 +252,12 @@ def patterned_sitemaps(file_system: Directory):
         ))
         pattern = format_pattern(pattern)
         matches = []
+        found = []
         for file in file_system.renderable():
             if match(pattern, file.relative_url):
                 matches.append(SitemapUrl(file.url, file.epoch))
-                file_system.remove(file.full_path)
+                found.append(file.full_path)
+        file_system.remove_many(found)
 
         #! WARNING: Do not parse xml files as html in phml. This will override a lot of security
         #! and shoud not be done with any untrusted xml files.
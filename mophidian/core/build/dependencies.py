@@ -0,0 +1,165 @@
+from __future__ import annotations
+from collections import defaultdict
+import os
+from re import findall
+from typing import Iterable
+
+from mophidian.config import CONFIG
+from mophidian.file_system import Directory, File, Markdown, Nav, Renderable
+
+__all__ = ["DependencyGraph"]
+
+
+class DependencyGraph:
+    """What each page was rendered from.
+
+    Pages are linked to keys for their layouts, the components they use, the files their
+    links point to, and the global data they read. File events look up the pages that depend
+    on the changed keys so that only those pages are rendered again.
+    """
+
+    MOPHIDIAN = "global:mophidian"
+    """Key for the exposed `mophidian` global. Only changes with the config."""
+
+    def __init__(self, component_files: Directory) -> None:
+        self.component_files = component_files
+        self._dependencies: dict[str, set[str]] = {}
+        self._dependents: dict[str, set[str]] = defaultdict(set)
+        self._tags: dict[str, tuple[tuple[int, int], set[str]]] = {}
+
+    @staticmethod
+    def layout(full_path: str) -> str:
+        """Key for a layout."""
+        return f"layout:{full_path}"
+
+    @staticmethod
+    def component(cname: str) -> str:
+        """Key for a component by name. Pages depend on the name so that they also depend on
+        components that are added later.
+        """
+        return f"component:{cname}"
+
+    @staticmethod
+    def nav(*names: str) -> str:
+        """Key for a section of the nav by the names of the sections leading to it. No names is
+        the whole nav. Changes when pages in the section are added, removed, or retitled.
+        """
+        return f"nav:/{'/'.join(names)}"
+
+    @classmethod
+    def navs(cls, nav: Nav, page: Renderable) -> list[str]:
+        """Keys for the section of the nav that lists the page along with every section above it.
+        Empty if the page is not in the nav.
+        """
+
+        def find(current: Nav, names: tuple[str, ...]) -> tuple[str, ...] | None:
+            for child in current.children:
+                if isinstance(child, Nav):
+                    found = find(child, (*names, child.name))
+                    if found is not None:
+                        return found
+                elif child.full_path == page.full_path:
+                    return names
+            return None
+
+        names = find(nav, ())
+        if names is None:
+            return []
+        return [cls.nav(*names[:depth]) for depth in range(len(names) + 1)]
+
+    @staticmethod
+    def links(file: File) -> list[str]:
+        """Keys that links to the file could be resolved by."""
+
+        paths = {file.full_path, file.path, file.src, file.relative_url}
+        return [f"link:{path.strip('/')}" for path in paths]
+
+    def component_tags(self, full_path: str) -> set[str]:
+        """Tag names used in a components source. Only read again when the file changes."""
+
+        try:
+            stat = os.stat(full_path)
+            key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return set()
+
+        cached = self._tags.get(full_path)
+        if cached is None or cached[0] != key:
+            with open(full_path, "r", encoding="utf-8") as file:
+                cached = (key, set(findall(r"<([A-Za-z][\w.\-]*)", file.read())))
+            self._tags[full_path] = cached
+        return cached[1]
+
+    def layouts(self, page: Renderable) -> set[str]:
+        """Keys for the layouts the page currently uses."""
+
+        keys = set()
+        layout = page.layout
+        while layout is not None:
+            keys.add(self.layout(layout.full_path))
+            layout = layout.parent
+        return keys
+
+    def layouts_changed(self, page: Renderable) -> bool:
+        """Check if the layouts the page uses differ from the ones it was rendered with."""
+
+        recorded = {key for key in self.dependencies(page) if key.startswith("layout:")}
+        return recorded != self.layouts(page)
+
+    def keys(self, page: Renderable) -> set[str]:
+        """Everything the page was last rendered from."""
+
+        keys = {*page.globals, *self.layouts(page)}
+
+        names = set(page.tags or (component.cname for component in page.components))
+        seen = set()
+        components = list(page.components)
+        while len(components) > 0:
+            component = components.pop()
+            if component.full_path not in seen:
+                seen.add(component.full_path)
+                tags = self.component_tags(component.full_path)
+                names |= tags
+                components.extend(self.component_files.components_by_name(tags))
+        keys.update(self.component(name) for name in names)
+
+        if isinstance(page, Markdown):
+            if page.links is not None:
+                keys.update(f"link:{target.strip('/')}" for target in page.links.resolved)
+            if CONFIG.markdown.pygmentize.highlight:
+                keys.add(f"link:{CONFIG.markdown.pygmentize.path.strip('/')}")
+        return keys
+
+    def record(self, page: Renderable):
+        """Replace the recorded dependencies of a page from how it was last rendered."""
+
+        self.forget(page)
+        keys = self.keys(page)
+        self._dependencies[page.full_path] = keys
+        for key in keys:
+            self._dependents[key].add(page.full_path)
+
+    def forget(self, page: Renderable):
+        """Remove a page from the graph."""
+
+        for key in self._dependencies.pop(page.full_path, set()):
+            dependents = self._dependents.get(key)
+            if dependents is not None:
+                dependents.discard(page.full_path)
+                if len(dependents) == 0:
+                    self._dependents.pop(key)
+
+    def dependencies(self, page: Renderable) -> set[str]:
+        """The keys a page was recorded with."""
+        return self._dependencies.get(page.full_path, set())
+
+    def dependents(self, keys: Iterable[str]) -> set[str]:
+        """Full paths of the pages that depend on any of the keys."""
+
+        pages = set()
+        for key in keys:
+            pages |= self._dependents.get(key, set())
+        return pages
+
+    def __len__(self) -> int:
+        return len(self._dependencies)
@@ -0,0 +1,185 @@
+from __future__ import annotations
+from hashlib import sha256
+import json
+import os
+from pathlib import Path
+
+from mophidian import CONFIG
+from mophidian.file_system import File
+
+__all__ = ["Manifest"]
+
+
+def content_hash(content: str | bytes) -> str:
+    """Hash of the given content."""
+
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return sha256(content).hexdigest()
+
+
+def file_hash(path: str | Path, chunk_size: int = 1024 * 1024) -> str:
+    """Hash of a files content. The file is streamed in chunks so it is never fully loaded."""
+
+    digest = sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """Record of every file emitted to the output directory.
+
+    Each entry is keyed by the files path relative to the output directory and holds
+    the content hash, size, and source modified time of the emitted file. The hash of a
+    static file is only stored once it has been needed to compare the file. This lets
+    unchanged output be detected without reading the destination files, drives the
+    cleanup of orphaned output, and lists what changed for deploys.
+
+    The manifest is stored in the cache directory, not the output directory, so it is never
+    deployed with the site.
+    """
+
+    def __init__(self, out: str, path: str | None = None) -> None:
+        self.out = Path(out)
+        self.path = Path(path or CONFIG.build.cache.path).joinpath(
+            f"manifest-{self.out.name}.json"
+        )
+        self.entries: dict[str, dict] = {}
+        self.emitted: set[str] = set()
+        self.changed: list[str] = []
+        self.removed: list[str] = []
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as manifest:
+                self.entries = json.load(manifest).get("files", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def key(self, file: File) -> str:
+        """The files destination path relative to the output directory."""
+        return file.relative_dest
+
+    def _exists(self, key: str, entry: dict) -> bool:
+        """Check that the emitted file still exists with the recorded size."""
+        try:
+            return os.stat(self.out.joinpath(key)).st_size == entry["size"]
+        except OSError:
+            return False
+
+    def is_file_different(self, file: File, digest: str) -> bool:
+        """Check if the rendered content, by it's hash, differs from the emitted file."""
+
+        key = self.key(file)
+        entry = self.entries.get(key)
+        self.emitted.add(key)
+        return entry is None or entry["hash"] != digest or not self._exists(key, entry)
+
+    def is_static_different(self, file: File) -> bool:
+        """Check if a static files source differs from what was emitted.
+
+        Links to the source are always up to date. Otherwise the size and modified
+        time are checked first, and only when they are inconclusive are the files
+        compared with a streamed hash.
+        """
+
+        key = self.key(file)
+        entry = self.entries.get(key)
+        self.emitted.add(key)
+
+        dest = self.out.joinpath(key)
+        try:
+            source_stat = os.stat(file.full_path)
+            dest_stat = os.stat(dest)
+            if os.path.samefile(file.full_path, dest):
+                return False
+        except OSError:
+            return True
+
+        if source_stat.st_size != dest_stat.st_size:
+            return True
+
+        if (
+            entry is not None
+            and entry["size"] == source_stat.st_size
+            and entry["mtime"] == source_stat.st_mtime
+        ) or dest_stat.st_mtime_ns == source_stat.st_mtime_ns:
+            return False
+
+        digest = file_hash(file.full_path)
+        if (
+            entry is not None
+            and entry["hash"] is not None
+            and entry["size"] == dest_stat.st_size
+        ):
+            emitted = entry["hash"]
+        else:
+            emitted = file_hash(dest)
+
+        if digest == emitted:
+            # Same content so remember the new modified time to skip hashing next time
+            self.record(file, digest, source_stat.st_size, changed=False)
+            return False
+        return True
+
+    def record(self, file: File, digest: str | None, size: int, changed: bool = True):
+        """Record that a file was written to the output directory. The digest may be None
+        when the content was not hashed.
+        """
+
+        key = self.key(file)
+        try:
+            mtime = os.stat(file.full_path).st_mtime
+        except OSError:
+            mtime = 0.0
+
+        self.entries[key] = {"hash": digest, "size": size, "mtime": mtime}
+        self.emitted.add(key)
+        if changed:
+            self.changed.append(key)
+
+    def forget(self, file: File):
+        """Remove a file that was deleted from the output directory."""
+
+        key = self.key(file)
+        self.emitted.discard(key)
+        if self.entries.pop(key, None) is not None:
+            self.removed.append(key)
+
+    def prune(self) -> list[str]:
+        """Delete output from previous builds that was not emitted in this build along with any
+        directories left empty.
+
+        Returns:
+            list[str]: The keys of the removed files.
+        """
+
+        orphans = [key for key in self.entries if key not in self.emitted]
+        for key in orphans:
+            self.entries.pop(key)
+            self.removed.append(key)
+
+            dest = self.out.joinpath(key)
+            dest.unlink(missing_ok=True)
+
+            parent = dest.parent
+            while parent != self.out and parent.is_dir() and not any(parent.iterdir()):
+                parent.rmdir()
+                parent = parent.parent
+        return orphans
+
+    def save(self):
+        """Write the manifest to the cache directory."""
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as manifest:
+            json.dump(
+                {
+                    "changed": sorted(set(self.changed)),
+                    "removed": sorted(set(self.removed)),
+                    "files": self.entries,
+                },
+                manifest,
+                indent=2,
+            )
@@ -0,0 +1,106 @@
+from __future__ import annotations
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from mophidian.file_system import Nav
+from .dependencies import DependencyGraph
+
+__all__ = ["observe", "Observed", "ObservedNav"]
+
+_accessed: ContextVar[set[str] | None] = ContextVar("accessed", default=None)
+"""Keys of the globals read while observing. None when nothing is being observed. Each thread
+observes on it's own.
+"""
+
+
+@contextmanager
+def observe() -> Iterator[set[str]]:
+    """Collect the dependency graph keys of the observed globals that are read in the block."""
+
+    accessed: set[str] = set()
+    token = _accessed.set(accessed)
+    try:
+        yield accessed
+    finally:
+        _accessed.reset(token)
+
+
+def _read(key: str):
+    accessed = _accessed.get()
+    if accessed is not None:
+        accessed.add(key)
+
+
+class Observed:
+    """Proxy to a global exposed to the phml compiler. Any read of the value records the
+    proxies key. The proxy passes `isinstance` checks for the wrapped type.
+    """
+
+    __slots__ = ("_value", "_key")
+
+    def __init__(self, value: Any, key: str) -> None:
+        object.__setattr__(self, "_value", value)
+        object.__setattr__(self, "_key", key)
+
+    @property
+    def __class__(self):  # type: ignore[override]
+        return type(self._value)
+
+    def __getattr__(self, name: str) -> Any:
+        _read(self._key)
+        return getattr(self._value, name)
+
+    def __setattr__(self, name: str, value: Any):
+        _read(self._key)
+        setattr(self._value, name, value)
+
+    def __copy__(self) -> Observed:
+        return self
+
+    def __deepcopy__(self, memo: dict) -> Observed:
+        # Globals are shared between every page, copies of the ast keep the same proxy
+        return self
+
+    def __iter__(self):
+        _read(self._key)
+        return iter(self._value)
+
+    def __eq__(self, other: Any) -> bool:
+        _read(self._key)
+        return self._value == (other._value if isinstance(other, Observed) else other)
+
+    def __hash__(self) -> int:
+        return hash(self._value)
+
+    def __str__(self) -> str:
+        _read(self._key)
+        return str(self._value)
+
+    def __repr__(self) -> str:
+        _read(self._key)
+        return repr(self._value)
+
+
+class ObservedNav(Observed):
+    """Proxy to the nav or one of it's sections.
+
+    Looking up a section only records the section that was found, so pages that read a single
+    section are not rendered again when pages in other sections change.
+    """
+
+    __slots__ = ("_names",)
+
+    def __init__(self, nav: Nav, names: tuple[str, ...] = ()) -> None:
+        super().__init__(nav, DependencyGraph.nav(*names))
+        object.__setattr__(self, "_names", names)
+
+    def section(self, name: str) -> ObservedNav | None:
+        """Get a specific sub nav / section by it's name."""
+
+        section = self._value.section(name)
+        if section is None:
+            # The page depends on the section not existing
+            _read(self._key)
+            return None
+        return ObservedNav(section, (*self._names, section.name))
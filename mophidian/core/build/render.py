@@ -1,39 +1,234 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from pathlib import Path
 from shutil import rmtree
-from os import remove
+from threading import Event
+from os import cpu_count, remove
 import string
 import time
+from typing import Iterable
 
 from phml import PHML
+from saimll import Logger
 
 from mophidian import states, CONFIG
+from mophidian.core.cache import DiskCache, HighlightCache, MarkdownCache, RenderCache
+from mophidian.core.markdown import HIGHLIGHTER, MARKDOWN_POOL
 from mophidian.core.util import title, url, filter_sort
-from mophidian.file_system import Directory, Nav, FileState, File
+from mophidian.file_system import Directory, Nav, FileState, Renderable, Static, StaticMode
+from .context import Mophidian
+from .dependencies import DependencyGraph
+from .manifest import Manifest, content_hash
+from .construct import construct_components, construct_file_system, construct_static
+from .observe import Observed, ObservedNav, observe
 
 
-__all__ = ["render_pages", "write_static_files"]
+__all__ = ["render_pages", "write_static_files", "create_compiler", "discover"]
 
+_worker: dict = {}
+"""Per process state for page render workers. Populated by `_init_worker`."""
 
-def is_file_different(file: File, source_data: str) -> bool:
-    try:
-        with open(file.dest(states["dest"]), "r", encoding="utf-8") as dest:
-            dest_data = dest.read()
 
-        return source_data != dest_data
-    except Exception:
-        return True
+def create_compiler(components: Directory) -> PHML:
+    """Create a phml compiler with the globally exposed variables and the given components."""
 
+    phml = PHML()
+    phml.expose(
+        mophidian=Observed(Mophidian(), DependencyGraph.MOPHIDIAN),
+        filter_sort=filter_sort,
+    )
+    phml.add(
+        *[(cmpt.cname, cmpt.full_path) for cmpt in components.components()],
+        strip=CONFIG.site.components,
+    )  # type: ignore
+    return phml
 
-def is_static_different(file: File) -> bool:
-    try:
-        with open(file.full_path, "r", encoding="utf-8") as source:
-            source_data = source.read()
-        with open(file.dest(states["dest"]), "r", encoding="utf-8") as dest:
-            dest_data = dest.read()
 
-        return source_data != dest_data
-    except Exception:
-        return True
+def discover() -> tuple[Directory, Nav, Directory, Directory]:
+    """Discover all the pages, static files, and components of the project.
+
+    Returns:
+        tuple: The file system, nav, public static files, and components.
+    """
+
+    start = time.perf_counter()
+    components = construct_components(CONFIG.site.components)
+    file_system, nav = construct_file_system(CONFIG.site.source)
+    public = construct_static(CONFIG.site.public)
+    count = len(file_system.files()) + len(public.files()) + len(components.files())
+    Logger.Debug(f"Discovered {count} files in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return file_system, nav, public, components
+
+
+def write_static(
+    file: Static,
+    out: str,
+    manifest: Manifest,
+    dirty: bool = False,
+    mode: str = StaticMode.COPY,
+):
+    """Write a static file to the output directory if it's source has changed.
+
+    The file is recorded by it's size and modified time. It is only hashed later if those
+    can not tell whether it changed.
+    """
+
+    if dirty or manifest.is_static_different(file):
+        file.write(out, mode)
+        manifest.record(file, None, Path(file.full_path).stat().st_size)
+    file.state = FileState.NULL
+
+
+def remove_output(dest: Path):
+    """Remove a file from the output directory along with it's directory if it is the
+    last file in it.
+    """
+
+    if len(list(dest.parent.glob("**/*.*"))) == 1:
+        rmtree(dest.parent)
+    elif dest.is_file():
+        remove(dest)
+
+
+def render_page(
+    page: Renderable,
+    phml: PHML,
+    root: Directory,
+    static_files: Directory,
+    component_files: Directory,
+    nav: Nav,
+) -> str:
+    """Render a single page with it's layouts to a html string.
+
+    The keys of the exposed globals the page reads while rendering are stored in `page.globals`.
+    """
+
+    page_vars = {"title": page.title}
+
+    if CONFIG.build.rss:
+        page_vars["rss_feed"] = (
+            Path(CONFIG.site.base_url).joinpath(CONFIG.site.root, "feed.xml").as_posix()
+        )
+
+    with observe() as accessed:
+        output = page.render(
+            phml,
+            page_files=root,
+            static_files=static_files,
+            component_files=component_files,
+            **page_vars,
+            url=url,
+            title_case=title,
+            nav=ObservedNav(nav),
+        )
+    page.globals = sorted(accessed)
+    return output
+
+
+def content_caches() -> list[DiskCache]:
+    """The markdown and highlight caches that are currently in use."""
+    return [cache for cache in [MARKDOWN_POOL.cache, HIGHLIGHTER.cache] if cache is not None]
+
+
+def _init_worker(dest: str, cache: bool = False):
+    """Initialize a render worker process with it's own file system and phml compiler."""
+
+    states["dest"] = dest
+    if cache:
+        MARKDOWN_POOL.cache = MarkdownCache()
+        HIGHLIGHTER.cache = HighlightCache()
+    file_system, nav, public, components = discover()
+    _worker.update(
+        file_system=file_system,
+        nav=nav,
+        public=public,
+        components=components,
+        phml=create_compiler(components),
+    )
+
+
+def _render_worker(
+    full_path: str,
+) -> tuple[str, str, list[str], list[str], dict[str, tuple[int, int]]]:
+    """Render a page in a worker process.
+
+    Returns:
+        tuple: The pages full path, the rendered html, the names of the components it uses,
+            the keys of the globals it read, and the hits and misses of each content cache
+            while rendering the page.
+    """
+
+    caches = content_caches()
+    before = {cache.namespace: (cache.hits, cache.misses) for cache in caches}
+
+    page = _worker["file_system"].find(full_path)
+    output = render_page(
+        page,
+        _worker["phml"],
+        _worker["file_system"],
+        _worker["public"],
+        _worker["components"],
+        _worker["nav"],
+    )
+    stats = {
+        cache.namespace: (
+            cache.hits - before[cache.namespace][0],
+            cache.misses - before[cache.namespace][1],
+        )
+        for cache in caches
+    }
+    cnames = [component.cname for component in page.components]
+    return full_path, output, cnames, page.globals, stats
+
+
+def link_components(page: Renderable, cnames: list[str], components: dict):
+    """Link the components, by name, to a page that was rendered elsewhere."""
+
+    page.link_components([components[cname] for cname in cnames if cname in components])
+
+
+def render_parallel(pages: list[Renderable], component_files: Directory, jobs: int):
+    """Render pages across a pool of worker processes. Each worker discovers the project
+    and creates it's own phml compiler and markdown instance.
+
+    Yields:
+        tuple: The page and it's rendered html in the same order as the given pages.
+    """
+
+    caches = {cache.namespace: cache for cache in content_caches()}
+    lookup = {page.full_path: page for page in pages}
+    components = {component.cname: component for component in component_files.components()}
+    chunksize = max(1, len(pages) // (jobs * 4))
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(states["dest"], len(caches) > 0),
+    ) as pool:
+        for full_path, output, cnames, accessed, stats in pool.map(
+            _render_worker,
+            list(lookup),
+            chunksize=chunksize,
+        ):
+            # Collect the content cache stats from the workers
+            for namespace, (hits, misses) in stats.items():
+                if namespace in caches:
+                    caches[namespace].hits += hits
+                    caches[namespace].misses += misses
+
+            page = lookup[full_path]
+            link_components(page, cnames, components)
+            page.globals = accessed
+            yield page, output
+
+
+def cache_renders(rendered: Iterable[tuple[Renderable, str]], cache: RenderCache):
+    """Store each rendered page in the render cache as it is rendered."""
+
+    for page, output in rendered:
+        cache.store(page, output)
+        yield page, output
 
 
 def render_pages(
@@ -45,78 +240,157 @@ def render_pages(
     nav: Nav = Nav(""),
     *,
     dirty: bool = False,
-):
-    """Render all the pages with their layouts to their destination file."""
+    jobs: int = 1,
+    cache: RenderCache | None = None,
+    manifest: Manifest | None = None,
+    pages: Iterable[Renderable] | None = None,
+    cancel: Event | None = None,
+    finished: dict[str, str] | None = None,
+) -> bool:
+    """Render all the pages with their layouts to their destination file.
 
-    global_vars = {"url": url, "title_case": title, "nav": nav}
+    Args:
+        jobs (int): Number of worker processes to render pages with. `1` renders in the
+            current process and `0` uses one worker per cpu.
+        cache (RenderCache | None): Persistent cache of rendered pages. Pages with a
+            cached render are not rendered again.
+        manifest (Manifest | None): The build manifest of the output directory. If no manifest
+            is given then it is loaded and saved.
+        pages (Iterable[Renderable] | None): The only pages to check for updates and deletes.
+            Defaults to every page in the file system.
+        cancel (Event | None): Stop rendering when the event is set. When given, every page is
+            rendered before any output is written or removed, so a cancelled render leaves the
+            output directory as it was. The pages keep their state to be rendered again.
+        finished (dict[str, str] | None): Html of pages that finished rendering before an earlier
+            render was cancelled, by the pages full path. These pages are written without being
+            rendered again and are removed from it. When the render is cancelled, the pages
+            that finished rendering are added to it.
+
+    Returns:
+        bool: False if rendering was cancelled.
+    """
+
+    save = manifest is None
+    if manifest is None:
+        manifest = Manifest(out)
+
+    if jobs <= 0:
+        jobs = cpu_count() or 1
+
+    pages = list(root.renderable() if pages is None else pages)
+
+    # Remove deleted pages first so links to them are no longer resolved. Pages removed by a
+    # cancelled render are already gone.
+    deleted = [page for page in pages if page.state == FileState.DELETED]
+    root.remove_many(page.full_path for page in deleted if root.find(page.full_path) is page)
+    for page in deleted:
+        page.delete()
 
     epoch = time.time()
-    # Render pages
-    for page in root.renderable():
-        if page.state == FileState.UPDATED:
-            page_vars = {"title": page.title}
-
-            if CONFIG.build.rss:
-                page_vars["rss_feed"] = (
-                    Path(CONFIG.site.base_url).joinpath(CONFIG.site.root, "feed.xml").as_posix()
-                )
-
-            # Ensure path to file
-            page.dest(out).parent.mkdir(parents=True, exist_ok=True)
-
-            # Write file
-            dest = Path(page.dest(out))
-            output = page.render(
-                phml,
-                page_files=root,
-                static_files=static_files,
-                component_files=component_files,
-                **page_vars,
-                **global_vars,
-            )
-
-            if is_file_different(page, output) or dirty:
-                # Update page epoch
-                page.epoch = epoch
-                with open(dest, "+w", encoding="utf-8") as file:
-                    file.write(output)
-            page.state = FileState.NULL  # Set state as up to date and doesn't need to be rendered
-        elif page.state == FileState.DELETED:
-            dest = Path(page.dest(out))
-            root.remove(page.full_path)
-            page.delete()
-            if len(list(dest.parent.glob("**/*.*"))) == 1:
-                rmtree(dest.parent)
-            elif dest.is_file():
-                remove(dest)
-
-
-def write_static_files(root: Directory, static: Directory, out: str, dirty: bool = False):
-    """Write static files to their destination."""
-
-    # static files found in the pages directory
-    for file in root.static():
-        if (file.state == FileState.UPDATED and is_static_different(file)) or (
-            dirty and file.state != FileState.DELETED
-        ):
-            file.write(out)
-            FileState.NULL
-        elif file.state == FileState.DELETED:
-            dest = file.dest(out)
-            root.remove(file.full_path)
-            if len(list(dest.parent.glob("**/*.*"))) == 1:
-                rmtree(dest.parent)
-            else:
-                remove(dest)
-
-    # static files in the static directory
-    for file in static.static():
-        if file.state == FileState.UPDATED:
-            file.write(out)
-        elif file.state == FileState.DELETED:
-            dest = file.dest(out)
-            static.remove(file.full_path)
-            if len(list(dest.parent.glob("**/*.*"))) == 1:
-                rmtree(dest.parent)
+    updated = [page for page in pages if page.state == FileState.UPDATED]
+
+    cached = []
+    if finished is not None:
+        cached.extend(
+            (page, finished.pop(page.full_path)) for page in updated if page.full_path in finished
+        )
+        reused = {page.full_path for page, _ in cached}
+        updated = [page for page in updated if page.full_path not in reused]
+
+    if cache is not None:
+        misses = []
+        components = {cmpt.cname: cmpt for cmpt in component_files.components()}
+        for page in updated:
+            entry = cache.load(page)
+            if entry is not None:
+                output, cnames, page.globals = entry
+                link_components(page, cnames, components)
+                cached.append((page, output))
             else:
-                remove(dest)
+                misses.append(page)
+        updated = misses
+
+    if jobs > 1 and len(updated) > 1:
+        rendered = render_parallel(updated, component_files, min(jobs, len(updated)))
+    else:
+        rendered = (
+            (page, render_page(page, phml, root, static_files, component_files, nav))
+            for page in updated
+        )
+
+    if cache is not None:
+        rendered = cache_renders(rendered, cache)
+
+    if cancel is not None:
+        # Finish rendering before touching the output so it stays whole until the render is done
+        complete = []
+        for page, output in rendered:
+            complete.append((page, output))
+            if cancel.is_set():
+                if finished is not None:
+                    finished.update((page.full_path, output) for page, output in cached + complete)
+                return False
+        rendered = complete
+
+    for page in deleted:
+        manifest.forget(page)
+        remove_output(Path(page.dest(out)))
+
+    # Write pages
+    for page, output in chain(cached, rendered):
+        # Ensure path to file
+        dest = Path(page.dest(out))
+        dest.parent.mkdir(parents=True, exist_ok=True)
+
+        digest = content_hash(output)
+        if manifest.is_file_different(page, digest) or dirty:
+            # Update page epoch
+            page.epoch = epoch
+            with open(dest, "+w", encoding="utf-8") as file:
+                file.write(output)
+            manifest.record(page, digest, dest.stat().st_size)
+        page.state = FileState.NULL  # Set state as up to date and doesn't need to be rendered
+
+    if save:
+        manifest.save()
+
+    if cache is not None:
+        cache.evict()
+        Logger.Info(cache.report())
+    return True
+
+
+def write_static_files(
+    root: Directory,
+    static: Directory,
+    out: str,
+    dirty: bool = False,
+    manifest: Manifest | None = None,
+    mode: str = StaticMode.COPY,
+):
+    """Write static files to their destination.
+
+    Args:
+        mode (str): How static files are placed in the output directory. See `StaticMode`.
+        manifest (Manifest | None): The build manifest of the output directory. If no manifest
+            is given then it is loaded and saved.
+    """
+
+    save = manifest is None
+    if manifest is None:
+        manifest = Manifest(out)
+
+    # static files found in the pages directory and in the static directory
+    for files in [root, static]:
+        deleted = []
+        for file in files.static():
+            if file.state == FileState.DELETED:
+                deleted.append(file)
+                manifest.forget(file)
+                remove_output(file.dest(out))
+            elif file.state == FileState.UPDATED or dirty:
+                write_static(file, out, manifest, dirty, mode)
+        files.remove_many(file.full_path for file in deleted)
+
+    if save:
+        manifest.save()
@@ -0,0 +1,312 @@
+from __future__ import annotations
+from functools import lru_cache
+from hashlib import sha256
+import json
+import os
+from pathlib import Path
+from re import findall
+from typing import TYPE_CHECKING, Any
+
+from mophidian import __version__
+from mophidian.config import CONFIG
+
+from mophidian.core.markdown import MarkdownResult, dump_tree, load_tree
+
+if TYPE_CHECKING:
+    from mophidian.file_system import Directory, Renderable
+    from mophidian.file_system.markdown_extensions import LinkResolver
+
+__all__ = [
+    "DiskCache",
+    "RenderCache",
+    "MarkdownCache",
+    "HighlightCache",
+    "fingerprint",
+    "file_fingerprint",
+    "config_fingerprint",
+]
+
+
+def fingerprint(*parts: str | bytes) -> str:
+    """Create a stable hex digest from the given parts."""
+
+    digest = sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# Bounded since every edit adds a new entry in the long running dev server
+@lru_cache(maxsize=4096)
+def _file_fingerprint(path: str, mtime: int, size: int) -> str:
+    with open(path, "rb") as file:
+        return fingerprint(file.read())
+
+
+def file_fingerprint(path: str) -> str:
+    """Fingerprint of a files content. The hash is only recomputed when the files
+    modified time or size changes.
+    """
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return ""
+    return _file_fingerprint(path, stat.st_mtime_ns, stat.st_size)
+
+
+def config_fingerprint(*sections: str) -> str:
+    """Fingerprint of the given config sections along with the mophidian version."""
+
+    values = {}
+    for section in sections:
+        values[section] = getattr(CONFIG, section).as_dict()
+
+    # Cache settings never change the rendered output
+    values.get("build", {}).pop("cache", None)
+    # Extensions are collected from a set so their order is not stable between runs
+    if "markdown" in values:
+        values["markdown"]["extensions"] = sorted(values["markdown"]["extensions"])
+    return fingerprint(__version__, json.dumps(values, sort_keys=True, default=sorted))
+
+
+class DiskCache:
+    """Persistent json entry cache stored in a namespace of the cache directory.
+
+    Entries are evicted least recently used first when the whole cache directory
+    grows past the configured max size.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        path: str | None = None,
+        max_size: int | None = None,
+    ) -> None:
+        self.root = Path(path or CONFIG.build.cache.path)
+        self.path = self.root.joinpath(namespace)
+        self.max_size = (
+            max_size if max_size is not None else CONFIG.build.cache.max_size * 1024 * 1024
+        )
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, key: str) -> Path:
+        return self.path.joinpath(key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Any | None:
+        """Get an entry from the cache. None if the entry does not exist."""
+
+        entry = self._entry(key)
+        try:
+            with open(entry, "r", encoding="utf-8") as file:
+                value = json.load(file)
+            # Mark as recently used
+            os.utime(entry)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        """Add or replace an entry in the cache."""
+
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        temp = entry.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp, "w", encoding="utf-8") as file:
+            json.dump(value, file)
+        os.replace(temp, entry)
+
+    def evict(self):
+        """Remove the least recently used entries until the cache is within it's max size."""
+
+        entries = []
+        total = 0
+        for entry in self.root.glob("*/*/*.json"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+
+        entries.sort(key=lambda e: e[0])
+        for _, size, entry in entries:
+            if total <= self.max_size:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+    def report(self) -> str:
+        """Hit and miss summary of the cache."""
+
+        total = self.hits + self.misses
+        rate = (self.hits / total * 100) if total > 0 else 0
+        return f"{self.namespace} cache: {self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)"
+
+
+class RenderCache(DiskCache):
+    """Cache of rendered page html keyed by the fingerprints of everything a page
+    is rendered from. This includes the page source, it's layout chain, the components
+    it links, the site structure, the config, and the mophidian version.
+    """
+
+    def __init__(
+        self,
+        root: Directory,
+        static_files: Directory,
+        component_files: Directory,
+        **kwargs,
+    ) -> None:
+        super().__init__("render", **kwargs)
+        self.components = {cmpt.cname: cmpt for cmpt in component_files.components()}
+        self._nested: dict[str, set[str]] = {}
+
+        # Pages may read the nav, titles, urls, and frontmatter of other pages, along with
+        # checking for static files, so any structural change invalidates every page.
+        structure = [
+            f"{page.full_path}|{page.relative_url}|{page.title}|{self.meta(page)}"
+            for page in root.renderable()
+        ]
+        structure.extend(file.full_path for file in root.static())
+        structure.extend(file.full_path for file in static_files.static())
+        structure.extend(sorted(self.components))
+        self.site = fingerprint(
+            config_fingerprint("site", "markdown", "build"),
+            *sorted(structure),
+        )
+
+    @staticmethod
+    def meta(page: Renderable) -> str:
+        """Stable representation of a pages frontmatter. Empty for pages without frontmatter."""
+
+        meta = getattr(page, "meta", None)
+        if not meta:
+            return ""
+        return json.dumps(meta, sort_keys=True, default=str)
+
+    def key(self, page: Renderable) -> str:
+        """Cache key for the page based on it's source, layouts, and the site."""
+
+        parts = [self.site, page.full_path, file_fingerprint(page.full_path)]
+        layout = page.layout
+        while layout is not None:
+            parts.extend([layout.full_path, file_fingerprint(layout.full_path)])
+            layout = layout.parent
+        return fingerprint(*parts)
+
+    def nested(self, cname: str) -> set[str]:
+        """Names of the component and all the components it uses."""
+
+        if cname not in self._nested:
+            self._nested[cname] = {cname}
+            try:
+                with open(self.components[cname].full_path, "r", encoding="utf-8") as file:
+                    tags = set(findall(r"<([A-Za-z][\w.\-]*)", file.read()))
+            except OSError:
+                tags = set()
+
+            for tag in tags & set(self.components):
+                self._nested[cname] |= self.nested(tag)
+        return self._nested[cname]
+
+    def dependencies(self, cnames: list[str]) -> dict[str, str]:
+        """Fingerprints of the linked components and the components they use."""
+
+        deps = set()
+        for cname in cnames:
+            if cname in self.components:
+                deps |= self.nested(cname)
+        return {
+            cname: file_fingerprint(self.components[cname].full_path) for cname in sorted(deps)
+        }
+
+    def load(self, page: Renderable) -> tuple[str, list[str], list[str]] | None:
+        """Get the cached html, linked component names, and read globals for a page."""
+
+        entry = self.get(self.key(page))
+        if entry is not None:
+            if "globals" in entry and entry["dependencies"] == self.dependencies(
+                entry["components"]
+            ):
+                return entry["html"], entry["components"], entry["globals"]
+            self.hits -= 1
+            self.misses += 1
+        return None
+
+    def store(self, page: Renderable, html: str):
+        """Cache the rendered html of a page along with the components it links and the globals
+        it read.
+        """
+
+        cnames = list(dict.fromkeys(component.cname for component in page.components))
+        self.set(
+            self.key(page),
+            {
+                "html": html,
+                "components": cnames,
+                "dependencies": self.dependencies(cnames),
+                "globals": page.globals,
+            },
+        )
+
+
+class MarkdownCache(DiskCache):
+    """Cache of markdown converted to a phml tree, along with the toc tokens, keyed by the markdown
+    content, the markdown config, and the mophidian version.
+
+    Conversions that rewrote relative links are also keyed by the file's location and are
+    only used while every link target still resolves to the same url.
+    """
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__("markdown", **kwargs)
+        self.config = config_fingerprint("markdown")
+
+    def key(self, content: str, links: LinkResolver | None = None) -> str:
+        """Cache key for the markdown content converted for the given file."""
+
+        if links is None:
+            return fingerprint(self.config, content)
+        return fingerprint(self.config, content, links.file.src, links.file.relative_url)
+
+    def load(self, content: str, links: LinkResolver | None = None) -> MarkdownResult | None:
+        """Get the cached conversion of the markdown content."""
+
+        entry = self.get(self.key(content, links))
+        if entry is not None:
+            resolved = entry.get("links", {})
+            if "tree" in entry and (links is None or links.is_current(resolved)):
+                if links is not None:
+                    links.resolved.update(resolved)
+                return MarkdownResult(load_tree(entry["tree"]), entry["toc_tokens"], resolved)
+            self.hits -= 1
+            self.misses += 1
+        return None
+
+    def store(self, content: str, result: MarkdownResult, links: LinkResolver | None = None):
+        """Cache the conversion of the markdown content."""
+        self.set(
+            self.key(content, links),
+            {
+                "tree": dump_tree(result.tree),
+                "toc_tokens": result.toc_tokens,
+                "links": result.links,
+            },
+        )
+
+
+class HighlightCache(DiskCache):
+    """Cache of code highlighted with pygments. Keys are created by the highlighter from the
+    code, lexer, and formatter.
+    """
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__("highlight", **kwargs)
@@ -0,0 +1,673 @@
+from __future__ import annotations
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from hashlib import sha256
+import json
+import re
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+from xml.etree.ElementTree import HTML_EMPTY, Comment as EtreeComment, Element as EtreeElement
+
+from markdown import Markdown
+from markdown.extensions.footnotes import FootnotePostprocessor
+from markdown.postprocessors import AndSubstitutePostprocessor, RawHtmlPostprocessor
+from markdown.serializers import to_html_string, to_xhtml_string
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import HTML_PLACEHOLDER_RE, STX
+from phml import Formats
+from phml.core.nodes import Comment, DocType, Element, Root, Text
+import pygments
+
+from mophidian.config import CONFIG
+
+if TYPE_CHECKING:
+    from mophidian.core.cache import HighlightCache, MarkdownCache
+    from mophidian.file_system.markdown_extensions import LinkResolver
+
+__all__ = [
+    "MarkdownResult",
+    "ElementTreeConverter",
+    "MarkdownPool",
+    "Highlighter",
+    "create_markdown",
+    "dump_tree",
+    "load_tree",
+    "to_tree",
+    "MARKDOWN_POOL",
+    "HIGHLIGHTER",
+]
+
+
+@dataclass
+class MarkdownResult:
+    """The result of converting markdown to html."""
+
+    tree: Root
+    """The converted markdown as a phml tree."""
+
+    toc_tokens: list = field(default_factory=list)
+    """The table of contents tokens from the toc extension."""
+
+    links: dict[str, str | None] = field(default_factory=dict)
+    """The relative link targets that were resolved and the urls they resolved to."""
+
+
+def dump_tree(node: Root | Element) -> list:
+    """Compact json friendly form of the children of a phml tree."""
+
+    data = []
+    for child in node.children:
+        if isinstance(child, Element):
+            data.append([child.tag, child.properties, child.startend, dump_tree(child)])
+        elif isinstance(child, Text):
+            data.append(child.value)
+        elif isinstance(child, Comment):
+            data.append({"comment": child.value})
+        elif isinstance(child, DocType):
+            data.append({"doctype": child.lang})
+    return data
+
+
+def load_tree(data: list) -> Root:
+    """Create a phml tree from the data created by `dump_tree`."""
+
+    def children(items: list) -> list:
+        nodes = []
+        for item in items:
+            if isinstance(item, str):
+                nodes.append(Text(item))
+            elif isinstance(item, list):
+                tag, props, startend, nested = item
+                nodes.append(Element(tag, props, startend=startend, children=children(nested)))
+            elif "comment" in item:
+                nodes.append(Comment(item["comment"]))
+            else:
+                nodes.append(DocType(item["doctype"]))
+        return nodes
+
+    return Root(children=children(data))
+
+
+class _Unsupported(Exception):
+    """The tree can not be converted directly and must be serialized then parsed."""
+
+
+_TAG = re.compile(r"(?:[\w:.]+-?)+")
+_ATTRIBUTE = re.compile(r"[\w:\-@]+")
+
+_AMP = re.compile(r"&(?!(?:\#[0-9]+|\#x[0-9a-f]+|[0-9a-z]+);)", re.I)
+"""An `&` that does not start an entity."""
+
+
+def _escape_cdata(text: str) -> str:
+    """Escape text the same as python markdown's serializer."""
+
+    if "&" in text:
+        text = _AMP.sub("&amp;", text)
+    return text.replace("<", "&lt;").replace(">", "&gt;")
+
+
+def _escape_attribute(text: str) -> str:
+    """Escape an attribute value the same as python markdown's html serializer."""
+    return _escape_cdata(text).replace('"', "&quot;")
+
+
+class _HTML:
+    """Patterns and void elements of phml's html parser. Raw html is parsed with these so the
+    fragments match what phml would parse.
+    """
+
+    tag_start = re.compile(
+        r"(?P<comment><!--)|<(?!!--)(?P<opening>!|\/)?(?P<name>([\w:\.]+\-?)+)"
+        r"|<(?P<opening2>/)?(?=\s+>|>)"
+    )
+    tag_end = re.compile(r"(?P<closing>/?)>")
+    comment_close = re.compile(r"-->")
+    attribute = re.compile(
+        r"(?P<name>[\w:\-@]+)(?:=(?P<value>\{(?P<curly>[^\}]*)\/\}|\"(?P<double>[^\"]*)\""
+        r"|'(?P<single>[^']*)'|(?P<open>[^>'\"]+)))?"
+    )
+    bracket_attribute = re.compile(r"^\s*\{((?:\s|.)*)\/\}\s*$")
+    self_closing = frozenset(
+        [
+            "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+            "param", "source", "track", "wbr", "command", "keygen", "menuitem", "Slot",
+        ]
+    )
+
+
+_PROBE = "".join(
+    [
+        "<!DOCTYPE html><div class=\"a b\" id='c' data-d=e hidden checked=\"yes\" open=\"no\" ",
+        ":value=\"{value/}\" title={title/} @click=f><p>Text &amp; <b>bold</b> & <i>more</i></p>",
+        "<!-- comment <b>not</b> --><img src=\"a.png\" alt=x/>",
+        *(f"<{tag}>" for tag in sorted(_HTML.self_closing)),
+        *(f"<{tag}></{tag}>" for tag in sorted(HTML_EMPTY - _HTML.self_closing)),
+        "<custom-element data-x></custom-element></div>tail",
+    ]
+)
+"""Raw html that uses every rule copied from phml's parser."""
+
+
+@lru_cache(maxsize=None)
+def _matches_dependencies() -> bool:
+    """Check that the rules copied from phml's parser and python markdown's serializer still
+    behave the same as the installed versions. Direct conversion is only used when they do.
+    """
+
+    try:
+        parsed = dump_tree(ElementTreeConverter.parse(_PROBE))
+        fragment = dump_tree(Root(children=ElementTreeConverter._fragment(_PROBE)))
+    except Exception:
+        return False
+
+    probe = EtreeElement("p", {"title": "a & b &amp; <c> \"d\""})
+    probe.text = "a & b &amp; &#35; &#x23; <c> \"d\""
+    escaped = f'<p title="{_escape_attribute(probe.get("title"))}">{_escape_cdata(probe.text)}</p>'
+    return parsed == fragment and to_html_string(probe) == escaped
+
+
+class ElementTreeConverter:
+    """Convert the ElementTree of a markdown conversion directly into a phml tree.
+
+    The tree is converted to the same nodes that parsing the serialized html with phml would
+    create. Escaping, attribute values, void elements, and the raw html, entity, and footnote
+    placeholders are all handled as the serializer and postprocessors would. Raw html stashed
+    by the markdown parser is still parsed, but only the raw html itself.
+
+    The escaping and html parsing rules are copies of python markdown's and phml's, since
+    phml's own parser is too slow to run on each piece of raw html. They are checked against
+    the installed packages before the first direct conversion. When a tree or it's
+    postprocessors can not be represented exactly, or the copied rules no longer match, the
+    tree is serialized and parsed instead.
+    """
+
+    POSTPROCESSORS = (RawHtmlPostprocessor, AndSubstitutePostprocessor, FootnotePostprocessor)
+    """Postprocessors that only replace placeholders, so they can be run on each text."""
+
+    def __init__(self, md: Markdown) -> None:
+        self.md = md
+        self.postprocessors = list(md.postprocessors)
+        self.xhtml = md.serializer is to_xhtml_string
+        self.direct = (
+            md.stripTopLevelTags
+            and md.serializer in (to_html_string, to_xhtml_string)
+            and all(isinstance(pp, self.POSTPROCESSORS) for pp in self.postprocessors)
+            and _matches_dependencies()
+        )
+
+    def convert(self, root: EtreeElement) -> Root:
+        """Convert the root of a markdown conversion into a phml tree."""
+
+        if self.direct:
+            try:
+                children = []
+                self._text(_escape_cdata(root.text or ""), children)
+                for elem in root:
+                    self._node(elem, children)
+                return Root(children=self._strip(children))
+            except _Unsupported:
+                pass
+        return self.parse(self.serialize(root))
+
+    def serialize(self, root: EtreeElement) -> str:
+        """Serialize the tree and run the postprocessors as the markdown converter would."""
+
+        output = self.md.serializer(root)
+        if self.md.stripTopLevelTags:
+            start = output.find(f"<{self.md.doc_tag}>")
+            end = output.rfind(f"</{self.md.doc_tag}>")
+            if start >= 0 and end >= 0:
+                output = output[start + len(self.md.doc_tag) + 2 : end].strip()
+            else:
+                output = ""
+
+        for pp in self.postprocessors:
+            output = pp.run(output)
+        return output.strip()
+
+    @staticmethod
+    def parse(html: str) -> Root:
+        """Parse html into a phml tree."""
+        return Formats.HTML.parse(html).tree
+
+    @classmethod
+    def _fragment(cls, html: str) -> list:
+        """Parse a piece of raw html. The html must be balanced on it's own.
+
+        This follows phml's parser, with the same patterns, without tracking source positions.
+        """
+
+        root = Root()
+        current = root
+        stack: list[str] = []
+        position = 0
+        while (begin := _HTML.tag_start.search(html, position)) is not None:
+            if begin.start() > position:
+                current.append(Text(html[position : begin.start()]))
+
+            if begin.group("comment") is not None:
+                end = _HTML.comment_close.search(html, begin.end())
+                if end is None:
+                    raise _Unsupported()
+                current.append(Comment(html[begin.end() : end.start()]))
+                position = end.end()
+                continue
+
+            end = _HTML.tag_end.search(html, begin.end())
+            if end is None:
+                raise _Unsupported()
+            attributes = cls._attributes(html[begin.end() : end.start()])
+            position = end.end()
+
+            name = begin.group("name") or ""
+            opening = begin.group("opening") or begin.group("opening2")
+            if opening == "/":
+                if len(stack) == 0 or stack.pop() != name:
+                    raise _Unsupported()
+                current = current.parent
+            elif opening == "!":
+                current.append(DocType(attributes.get("lang", "html")))
+            elif end.group("closing") != "/" and name not in _HTML.self_closing and opening is None:
+                stack.append(name)
+                current.append(Element(name, attributes))
+                current = current.children[-1]
+            else:
+                current.append(Element(name, attributes, startend=True))
+
+        if len(stack) > 0:
+            raise _Unsupported()
+        if position < len(html):
+            current.append(Text(html[position:]))
+        return root.children
+
+    @staticmethod
+    def _attributes(source: str) -> dict:
+        """Parse attributes the same as phml's parser."""
+
+        attributes = {}
+        for attribute in _HTML.attribute.finditer(source):
+            name, value = attribute.group("name"), attribute.group("value")
+            if value is not None and (bracket := _HTML.bracket_attribute.match(value)) is not None:
+                if not name.startswith(":"):
+                    name = ":" + name
+                value = bracket.group(1)
+            else:
+                value = attribute.group("double") or attribute.group("single") or attribute.group("open")
+
+            if value in ["yes", "true", None]:
+                value = True
+            elif value in ["no", "false"]:
+                value = False
+            attributes[name] = value
+        return attributes
+
+    def _serialized(self, elem: EtreeElement) -> list:
+        """Serialize an element, without it's tail, and parse it."""
+
+        tail, elem.tail = elem.tail, None
+        try:
+            html = self.md.serializer(elem)
+        finally:
+            elem.tail = tail
+        return self._fragment(self._substitute(html))
+
+    def _append(self, children: list, node: Any):
+        """Add a node merging neighboring text like the parser does."""
+
+        if isinstance(node, Text) and len(children) > 0 and isinstance(children[-1], Text):
+            children[-1].value += node.value
+        else:
+            children.append(node)
+
+    def _substitute(self, value: str) -> str:
+        """Run the postprocessors on a piece of the output."""
+
+        # Every placeholder the postprocessors replace starts with STX
+        if STX in value:
+            for pp in self.postprocessors:
+                value = pp.run(value)
+        return value
+
+    def _text(self, value: str, children: list):
+        if value == "":
+            return
+
+        value = self._substitute(value)
+        if "<" in value:
+            for node in self._fragment(value):
+                self._append(children, node)
+        elif value != "":
+            self._append(children, Text(value))
+
+    def _properties(self, elem: EtreeElement) -> dict:
+        properties = {}
+        for name, value in sorted(elem.items()):
+            if (
+                not isinstance(name, str)
+                or not isinstance(value, str)
+                or _ATTRIBUTE.fullmatch(name) is None
+            ):
+                raise _Unsupported()
+
+            value = self._substitute(_escape_attribute(value))
+            if '"' in value:
+                raise _Unsupported()
+
+            if (not self.xhtml and name == value) or value in ("", "yes", "true"):
+                properties[name] = True
+            elif value in ("no", "false"):
+                properties[name] = False
+            else:
+                properties[name] = value
+        return properties
+
+    def _node(self, elem: EtreeElement, children: list):
+        tag = elem.tag
+        if tag is EtreeComment:
+            value = self._substitute(_escape_cdata(elem.text or ""))
+            if "-->" in value:
+                raise _Unsupported()
+            self._append(children, Comment(value))
+        elif tag is None:
+            self._text(_escape_cdata(elem.text or ""), children)
+            for child in elem:
+                self._node(child, children)
+        elif not isinstance(tag, str) or _TAG.fullmatch(tag) is None:
+            raise _Unsupported()
+        elif (
+            tag == "p"
+            and len(elem.attrib) == 0
+            and len(elem) == 0
+            and HTML_PLACEHOLDER_RE.fullmatch(elem.text or "") is not None
+        ):
+            # Raw html on it's own line is unwrapped from the paragraph when it is block level
+            self._text(f"<p>{elem.text}</p>", children)
+        elif tag.lower() in HTML_EMPTY:
+            if not self.xhtml and (tag not in _HTML.self_closing or elem.text or len(elem) > 0):
+                raise _Unsupported()
+            self._append(children, Element(tag, self._properties(elem), startend=True))
+        else:
+            try:
+                nested = []
+                if elem.text:
+                    if tag.lower() in ("script", "style"):
+                        self._text(elem.text, nested)
+                    else:
+                        self._text(_escape_cdata(elem.text), nested)
+                for child in elem:
+                    self._node(child, nested)
+                self._append(children, Element(tag, self._properties(elem), children=nested))
+            except _Unsupported:
+                # Inline raw html stashes each tag on it's own, so the element is
+                # serialized and parsed as a whole
+                for node in self._serialized(elem):
+                    self._append(children, node)
+
+        if elem.tail:
+            self._text(_escape_cdata(elem.tail), children)
+
+    def _strip(self, children: list) -> list:
+        """Strip the whitespace from the start and end of the output."""
+
+        if len(children) > 0 and isinstance(children[0], Text):
+            children[0].value = children[0].value.lstrip()
+            if children[0].value == "":
+                children.pop(0)
+        if len(children) > 0 and isinstance(children[-1], Text):
+            children[-1].value = children[-1].value.rstrip()
+            if children[-1].value == "":
+                children.pop()
+        return children
+
+
+class _CaptureTreeprocessor(Treeprocessor):
+    """Keep the finished tree on the converter and hand an empty tree to the serializer."""
+
+    def run(self, root: EtreeElement) -> EtreeElement:
+        self.md.tree = root
+        return EtreeElement(self.md.doc_tag)
+
+
+def create_markdown() -> Markdown:
+    """Create a markdown converter with the extensions from the config along with the
+    extension that rewrites relative links to source files.
+
+    The finished tree of each conversion is captured so that it can be converted directly
+    into a phml tree.
+    """
+    from mophidian.file_system.markdown_extensions import _RelativePathExtension
+
+    md = Markdown(
+        extensions=[*CONFIG.markdown.extensions, _RelativePathExtension()],
+        extension_configs=CONFIG.markdown.extension_configs,
+    )
+    md.treeprocessors.register(_CaptureTreeprocessor(md), "capture", -100)
+    md.highlighter = HIGHLIGHTER
+    return md
+
+
+def to_tree(md: Markdown, content: str) -> Root:
+    """Convert markdown into a phml tree with the given markdown converter."""
+
+    md.tree = None
+    highlighter = getattr(md, "highlighter", None)
+    if highlighter is not None:
+        with highlighter.active():
+            html = md.convert(content)
+    else:
+        html = md.convert(content)
+    root, md.tree = md.tree, None
+    if root is None:
+        # Blank content or a converter that does not capture it's tree
+        return ElementTreeConverter.parse(html)
+    return ElementTreeConverter(md).convert(root)
+
+
+class MarkdownPool:
+    """Thread safe pool of markdown converters.
+
+    Markdown converters hold state between conversions, so a converter is only ever used by
+    one conversion at a time. Idle converters are reused and new ones are only created when
+    every converter is in use.
+
+    When a cache is set, conversions are looked up in and stored to the cache.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Markdown] = create_markdown,
+        cache: MarkdownCache | None = None,
+    ) -> None:
+        self.factory = factory
+        self.cache = cache
+        self._idle: list[Markdown] = []
+        self._lock = Lock()
+
+    @contextmanager
+    def acquire(self) -> Iterator[Markdown]:
+        """Borrow a reset converter from the pool for the duration of the context."""
+
+        with self._lock:
+            converter = self._idle.pop() if len(self._idle) > 0 else None
+
+        if converter is None:
+            converter = self.factory()
+
+        try:
+            yield converter.reset()
+        finally:
+            with self._lock:
+                self._idle.append(converter)
+
+    def convert(self, content: str, links: LinkResolver | None = None) -> MarkdownResult:
+        """Convert markdown to a phml tree along with the table of contents tokens.
+
+        Args:
+            content (str): The markdown to convert.
+            links (LinkResolver | None): Resolves relative links to source files for the file
+                being converted. Links are left as is when no resolver is given.
+        """
+
+        cache = self.cache
+        if cache is not None:
+            result = cache.load(content, links)
+            if result is not None:
+                return result
+
+        with self.acquire() as converter:
+            converter.links = links
+            try:
+                tree = to_tree(converter, content)
+            finally:
+                converter.links = None
+            result = MarkdownResult(
+                tree,
+                list(getattr(converter, "toc_tokens", [])),
+                dict(links.resolved) if links is not None else {},
+            )
+
+        if cache is not None:
+            cache.store(content, result, links)
+        return result
+
+    def clear(self):
+        """Remove all idle converters. New converters are created with the current config."""
+
+        with self._lock:
+            self._idle.clear()
+
+
+MARKDOWN_POOL = MarkdownPool()
+"""Shared pool of markdown converters built from the config."""
+
+
+_active_highlighter: ContextVar[Highlighter | None] = ContextVar("highlighter", default=None)
+"""Highlighter of the markdown conversion in progress. None outside of mophidian's conversions."""
+
+_original_highlight: dict[str, Callable] = {}
+"""The highlight functions of the highlight extensions before the hook was installed."""
+
+
+def _highlight_hook(name: str) -> Callable:
+    """Highlight function for the extension module of the given name. Uses the active
+    highlighter and otherwise the extensions original highlight function.
+    """
+
+    def highlight(code: str, lexer: Any, formatter: Any, outfile: Any = None) -> str | None:
+        highlighter = _active_highlighter.get()
+        if highlighter is None:
+            return _original_highlight[name](code, lexer, formatter, outfile)
+        return highlighter(code, lexer, formatter, outfile)
+
+    return highlight
+
+
+class Highlighter:
+    """Memoized replacement for `pygments.highlight`.
+
+    Highlighted code is kept in a bounded in memory LRU that is shared by every page. When a
+    cache is set, highlighted code is also persisted between builds. Entries are keyed by the
+    code, the lexer and it's options, the formatter and it's options (style, css class, line
+    numbers, etc.), and the pygments version.
+
+    The highlighter is only used for the markdown converted inside of `active`. Any other
+    markdown converter in the process highlights with pygments as usual.
+    """
+
+    def __init__(self, size: int = 1024, cache: HighlightCache | None = None) -> None:
+        self.size = size
+        self.cache = cache
+        self.memory_hits = 0
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        self._lock = Lock()
+
+    @staticmethod
+    def _options(obj: Any) -> str:
+        return json.dumps(getattr(obj, "options", {}), sort_keys=True, default=repr)
+
+    def key(self, code: str, lexer: Any, formatter: Any) -> str:
+        """Cache key for highlighting the code with the lexer and formatter."""
+
+        parts = [
+            pygments.__version__,
+            f"{type(lexer).__module__}.{type(lexer).__name__}",
+            self._options(lexer),
+            *(f"{type(f).__name__}{self._options(f)}" for f in getattr(lexer, "filters", [])),
+            f"{type(formatter).__module__}.{type(formatter).__name__}",
+            self._options(formatter),
+            code,
+        ]
+        return sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def __call__(self, code: str, lexer: Any, formatter: Any, outfile: Any = None) -> str | None:
+        if outfile is not None:
+            return pygments.highlight(code, lexer, formatter, outfile)
+
+        key = self.key(code, lexer, formatter)
+        cache = self.cache
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                # Kept apart from the cache's hits so it only reports the persisted entries
+                self.memory_hits += 1
+
+        if result is not None:
+            return result
+
+        if cache is not None:
+            result = cache.get(key)
+        if result is None:
+            result = pygments.highlight(code, lexer, formatter)
+            if cache is not None:
+                cache.set(key, result)
+
+        with self._lock:
+            self._memory[key] = result
+            while len(self._memory) > self.size:
+                self._memory.popitem(last=False)
+        return result
+
+    @staticmethod
+    def install():
+        """Hook the codehilite and pymdownx highlight extensions so they can be redirected to
+        the active highlighter. The hook is only installed once per process.
+        """
+        import markdown.extensions.codehilite
+        import pymdownx.highlight
+
+        for module in [markdown.extensions.codehilite, pymdownx.highlight]:
+            if module.__name__ not in _original_highlight:
+                _original_highlight[module.__name__] = module.highlight
+                module.highlight = _highlight_hook(module.__name__)
+
+    @staticmethod
+    def uninstall():
+        """Restore the original highlight functions of the extensions."""
+        import markdown.extensions.codehilite
+        import pymdownx.highlight
+
+        for module in [markdown.extensions.codehilite, pymdownx.highlight]:
+            if module.__name__ in _original_highlight:
+                module.highlight = _original_highlight.pop(module.__name__)
+
+    @contextmanager
+    def active(self) -> Iterator[Highlighter]:
+        """Highlight the code blocks of markdown converted in the block, on this thread, with
+        this highlighter.
+        """
+
+        self.install()
+        token = _active_highlighter.set(self)
+        try:
+            yield self
+        finally:
+            _active_highlighter.reset(token)
+
+
+HIGHLIGHTER = Highlighter()
+"""Shared memoized highlighter used by the markdown converters from `create_markdown`."""
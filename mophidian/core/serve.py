@@ -1,10 +1,18 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+import os
+import posixpath
 from pathlib import Path
+from queue import Queue
+from threading import Event, Lock, Thread, Timer
+from traceback import format_exc
+from typing import Iterable
 
 from watchserver import LiveCallback, ServerPath
 from saimll import SAIML, Log, LogLevel, style
 
 from mophidian import CONFIG, states
-from mophidian.core import render_pages, write_static_files
+from mophidian.core import render_pages, write_static_files, DependencyGraph, Manifest
 from mophidian.file_system import (
     Component,
     FileState,
@@ -16,9 +24,24 @@ from mophidian.file_system import (
 )
 
 from .build import build
+from .build.construct import is_ignored_relative
 from .util import REGEX
 
 
+def is_ignored_path(path: str) -> bool:
+    """Check if the path is ignored by discovery. The path is made relative to the watched
+    directory it is in, which is what discovery matches the `site.ignore` globs against.
+    """
+
+    relative = posixpath.normpath(path)
+    for root in [CONFIG.site.source, CONFIG.site.public, CONFIG.site.components]:
+        root = posixpath.normpath(root)
+        if relative.startswith(f"{root}/"):
+            relative = relative[len(root) + 1:]
+            break
+    return is_ignored_relative(relative)
+
+
 def is_static(path) -> bool:
     """Check if the path is a static path."""
     path = Path(path)
@@ -53,18 +76,79 @@ def is_component(path) -> bool:
     )
 
 
+class Cancelled(Exception):
+    """A render was cancelled by a newer batch of file events."""
+
+    def __init__(self, pages: Iterable[Renderable]) -> None:
+        super().__init__("Render cancelled by newer file events")
+        self.pages = list(pages)
+        """The pages that were not written."""
+
+
+@dataclass
+class Changes:
+    """What a batch of file events changed. Filled in by the event handlers of `Callbacks` and
+    then rendered all at once.
+    """
+
+    pages: dict[str, Renderable] = field(default_factory=dict)
+    """Pages to render by their full path."""
+
+    keys: set[str] = field(default_factory=set)
+    """Dependency graph keys that changed. Pages that depend on them are rendered."""
+
+    created: list[Renderable] = field(default_factory=list)
+    """New pages. The nav sections listing them are only known once the nav is rebuilt."""
+
+    nav: bool = False
+    """Pages were added or removed so the nav must be rebuilt."""
+
+    layouts: bool = False
+    """Layouts were added or removed so the layout hierarchy must be rebuilt."""
+
+    static: bool = False
+    """Static files changed so they must be written and every page reloaded."""
+
+    def render(self, *pages: Renderable):
+        """Add pages to render."""
+        for page in pages:
+            self.pages[page.full_path] = page
+
+    def merge(self, other: Changes):
+        """Add the changes of a newer batch."""
+
+        self.pages.update(other.pages)
+        self.keys |= other.keys
+        self.created.extend(other.created)
+        self.nav |= other.nav
+        self.layouts |= other.layouts
+        self.static |= other.static
+
+
 class Callbacks(LiveCallback):
-    """Live server callback and file management."""
+    """Live server callback and file management.
+
+    File events are collected for `CONFIG.build.batch_delay` seconds after the last event
+    and deduplicated by path. Each batch is rendered at once on a background worker thread and
+    the urls to reload are put in the `reloads` queue.
+
+    A batch that arrives while the worker is rendering cancels that render. Nothing from the
+    cancelled render is written, so the server keeps serving the last complete output, and its
+    changes are rendered again along with the new batch. Pages that finished rendering before
+    the cancel are kept unless the new batch affects them.
+    """
 
-    def __init__(self) -> None:
+    def __init__(self, delay: float | None = None) -> None:
         # Initialize the logger to only log warnings or custom logs.
         self.logger = Log(level=LogLevel.WARNING)
 
         # Build website
         self.logger.Custom("Building website...", label="▮", clr="cyan")
         (self.file_system, self.static_files, self.component_files, self.phml) = build(
-            True
+            True, static_mode=CONFIG.build.static_mode
         )
+        self.manifest = Manifest(states["dest"])
+        self.nav = self.file_system.build_nav()
 
         # Map for fast indexing and logic checking of existing files
         self.files = {file.full_path: file for file in self.file_system.files()}
@@ -73,6 +157,29 @@ class Callbacks(LiveCallback):
             file.full_path: file for file in self.component_files.files()
         }
 
+        # What each page was rendered from so file events only render the affected pages
+        self.dependencies = DependencyGraph(self.component_files)
+        for page in self.file_system.renderable():
+            self.dependencies.record(page)
+
+        self.delay = CONFIG.build.batch_delay if delay is None else delay
+        self.reloads: Queue | None = None
+        """The live servers reload queue. Urls are put in it after each batch is rendered."""
+
+        self._events: set[str] = set()
+        self._timer: Timer | None = None
+        self._lock = Lock()
+
+        self._jobs: Queue[set[str]] = Queue()
+        self._cancel = Event()
+        self._pending: Changes | None = None
+        self._finished: dict[str, str] = {}
+        """Html of the pages that finished rendering before a render was cancelled."""
+        self._listed: dict[str, tuple] = {}
+        """Title and frontmatter of the pending pages from before they were rendered."""
+        self._worker = Thread(target=self.work, name="mophidian-render", daemon=True)
+        self._worker.start()
+
     def render_log_content(self, cmpt: str | None, path: str | None) -> str:
         """Render either component or path text for a log event."""
         return (
@@ -107,129 +214,315 @@ class Callbacks(LiveCallback):
         )
 
     def create(self, root: str, file: str) -> list[str]:
-        if is_static(file):
-            self.create_static(file)
-            self.log_reload("**/*")
-            return ["**"]
-
-        if is_page(file):
-            return self.create_page(file)
-
-        if is_layout(file):
-            return self.create_layout(file)
-
-        if is_component(file):
-            self.create_component(file)
-            self.log_reload("**/*")
-            return ["**"]
-
-        return []
+        return self.queue(file)
 
     def update(self, root: str, file: str) -> list[str]:
-        if is_static(file):
-            self.update_static(file)
-            self.log_reload("**/*")
-            return ["**"]
-
-        if is_page(file):
-            return self.update_page(file)
-
-        if is_layout(file):
-            return self.update_layout(file)
-
-        if is_component(file):
-            return self.update_component(file)
-
-        return []
+        return self.queue(file)
 
     def remove(self, root: str, file: str) -> list[str]:
-        if is_static(file):
-            self.remove_static(file)
-            self.log_reload("**/*")
-            return ["**"]
+        return self.queue(file)
+
+    def queue(self, file: str) -> list[str]:
+        """Add a file event to the current batch and restart the batch's timer.
+
+        Returns:
+            list[str]: Always empty, the urls to reload are put in `reloads` once the batch
+                is rendered.
+        """
+
+        file = file.replace("\\", "/")
+        if is_ignored_path(file):
+            return []
+
+        with self._lock:
+            self._events.add(file)
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+        return []
 
-        if is_page(file):
-            return self.remove_page(file)
+    def flush(self):
+        """Hand the current batch of file events to the render worker. Cancels the render the
+        worker is currently doing.
+        """
+
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            events, self._events = self._events, set()
+
+        if len(events) > 0:
+            self._cancel.set()
+            self._jobs.put(events)
+
+    def wait(self):
+        """Block until the render worker has finished every batch handed to it."""
+        self._jobs.join()
+
+    def work(self):
+        """Render worker loop. Renders batches of file events as they are flushed."""
+
+        while True:
+            events = self._jobs.get()
+            # Batches that queued up while the last one rendered are rendered together
+            while not self._jobs.empty():
+                events |= self._jobs.get()
+                self._jobs.task_done()
+            self._cancel.clear()
+
+            try:
+                self.rebuild(events)
+            except Exception:
+                # The worker must keep running. The failed changes are kept by `rebuild`
+                self.logger.Error(
+                    "Failed to rebuild, the changes are rendered again with the next file "
+                    f"change:\n{format_exc()}"
+                )
+            finally:
+                self._jobs.task_done()
+
+    def rebuild(self, events: set[str]) -> list[str]:
+        """Apply a batch of file events and render the affected pages.
+
+        Changes from a cancelled or failed render are applied again along with the batch. Pages
+        that finished rendering before a cancel are only rendered again if the batch affects
+        them.
+
+        Returns:
+            list[str]: The urls to reload. They are also put in `reloads`. Empty if the render
+                was cancelled.
+
+        Raises:
+            Exception: Any error other than the render being cancelled. The changes are kept
+                and rendered again with the next batch.
+        """
+
+        changes, self._pending = self._pending or Changes(), None
+        try:
+            batch = Changes()
+            for path in sorted(events):
+                self.dispatch(path, batch)
+            self.discard_finished(batch)
+            changes.merge(batch)
+            reload_urls = self.apply(changes)
+        except Cancelled as cancelled:
+            changes.render(*cancelled.pages)
+            self._pending = changes
+            self.logger.Debug("Render cancelled by newer changes")
+            return []
+        except Exception:
+            self._pending = changes
+            raise
 
-        if is_layout(file):
-            return self.remove_layout(file)
+        self.log_reload(*reload_urls)
+        if self.reloads is not None:
+            for url in reload_urls:
+                self.reloads.put(ServerPath(url))
+        return reload_urls
 
-        if is_component(file):
-            return self.remove_component(file)
+    def dispatch(self, path: str, changes: Changes):
+        """Apply the net effect of the events for a path to the file system.
+
+        Events are coalesced by comparing what is known about the path with what is on disk.
+        A known file that still exists was updated, a known file that is gone was removed, and
+        an unknown file that exists was created.
+        """
+
+        known = path in self.files or path in self.statics or path in self.components
+        exists = os.path.isfile(path)
+
+        if known and exists:
+            kind = "update"
+        elif known:
+            kind = "remove"
+        elif exists:
+            kind = "create"
+        else:
+            return
+
+        if is_static(path):
+            category = "static"
+        elif is_page(path):
+            category = "page"
+        elif is_layout(path):
+            category = "layout"
+        elif is_component(path):
+            category = "component"
+        else:
+            return
+
+        getattr(self, f"{kind}_{category}")(path, changes)
+
+    def discard_finished(self, batch: Changes):
+        """Drop the kept renders of pages that a newer batch affects."""
+
+        if len(self._finished) == 0:
+            return
+        if batch.layouts or len(batch.created) > 0:
+            # What these affect is only known once the layouts and nav are rebuilt
+            self._finished.clear()
+            return
+
+        for full_path in list(self._finished):
+            page = self.files.get(full_path)
+            if (
+                page is None
+                or full_path in batch.pages
+                or not self.dependencies.keys(page).isdisjoint(batch.keys)
+            ):
+                self._finished.pop(full_path)
+
+    def apply(self, changes: Changes) -> list[str]:
+        """Rebuild what the changes affect and render the affected pages once. Applying the
+        same changes again is safe, which is how cancelled renders are retried.
+
+        Returns:
+            list[str]: The urls of the rendered pages to reload.
+
+        Raises:
+            Cancelled: When newer file events cancel the render.
+        """
+
+        if changes.nav:
+            self.nav = self.file_system.build_nav()
+        for page in changes.created:
+            changes.keys.update(DependencyGraph.navs(self.nav, page))
+
+        if changes.layouts:
+            changes.render(*self.relayout())
+
+        changes.render(*self.dependent_pages(changes.keys))
+        reload_urls = self.render_pages(changes.pages.values()) if changes.pages else []
+
+        # Written once the render can no longer be cancelled so the output stays whole
+        if changes.static:
+            self.write_static()
+            reload_urls.insert(0, "**")
+        return reload_urls
 
-        return []
+    def dependent_pages(self, keys: Iterable[str]) -> list[Renderable]:
+        """Pages that depend on any of the dependency graph keys."""
+        return [
+            self.files[path]
+            for path in self.dependencies.dependents(keys)
+            if path in self.files
+        ]
+
+    def render_pages(self, pages: Iterable[Renderable]) -> list[str]:
+        """Re-render the given pages and record what they depend on. Deleted pages are removed.
+
+        When a page's title or frontmatter changes, the pages that read the nav sections listing
+        it are rendered as well.
+
+        Returns:
+            list[str]: The urls of the rendered pages to reload.
+
+        Raises:
+            Cancelled: When newer file events cancel the render. Nothing is written.
+        """
+
+        pages = {page.full_path: page for page in pages}
+        for page in pages.values():
+            # What other pages can show of the page through the nav. Kept from the first attempt
+            # when a render was cancelled, since finished pages are not rendered again.
+            self._listed.setdefault(page.full_path, (page.title, getattr(page, "meta", None)))
+            if page.state != FileState.DELETED:
+                page.state = FileState.UPDATED
 
-    def render_pages(self):
-        """Re-render the site pages."""
-        render_pages(
+        # Kept renders of pages from before the other pages in this render changed
+        reused = {path for path in pages if path in self._finished}
+        finished = render_pages(
             self.file_system,
             self.static_files,
             self.component_files,
             states["dest"],
             self.phml,
-            self.file_system.build_nav(),
+            self.nav,
+            manifest=self.manifest,
+            pages=list(pages.values()),
+            cancel=self._cancel,
+            finished=self._finished,
         )
+        if not finished:
+            raise Cancelled(pages.values())
+        self.manifest.save()
+        listed = {path: self._listed.pop(path) for path in pages}
+
+        retitled = set()
+        for page in pages.values():
+            if page.state == FileState.DELETED:
+                self.dependencies.forget(page)
+            else:
+                self.dependencies.record(page)
+                if (page.title, getattr(page, "meta", None)) != listed[page.full_path]:
+                    retitled.update(DependencyGraph.navs(self.nav, page))
+
+        reload_urls = [ServerPath(page.url).lstrip().posix() for page in pages.values()]
+        if len(retitled) > 0:
+            rendered = self.render_pages(
+                page
+                for page in self.dependent_pages(retitled)
+                if page.full_path not in pages or page.full_path in reused
+            )
+            reload_urls.extend(url for url in rendered if url not in reload_urls)
+        return reload_urls
+
+    def relayout(self) -> list[Renderable]:
+        """Rebuild the layout hierarchy after a layout is added or removed.
+
+        Returns:
+            list[Renderable]: The pages whose layouts changed.
+        """
+
+        self.file_system.build_hierarchy()
+        return [
+            page
+            for page in self.file_system.renderable()
+            if self.dependencies.layouts_changed(page)
+        ]
 
     def write_static(self):
         """Re-write all site static files."""
-        write_static_files(self.file_system, self.static_files, states["dest"])
+        write_static_files(
+            self.file_system,
+            self.static_files,
+            states["dest"],
+            manifest=self.manifest,
+            mode=CONFIG.build.static_mode,
+        )
+        self.manifest.save()
 
-    def update_layout(self, path: str):
+    def update_layout(self, path: str, changes: Changes):
         """Update a given layout and all linked pages."""
-        path = path.replace("\\", "/")
         obj = self.files.get(path, None)
 
-        reload_urls = []
         if obj is not None and isinstance(obj, Layout):
             obj.state = FileState.UPDATED
-            self.file_system.build_hierarchy()
-            for page in obj.linked_files:
-                page.state = FileState.UPDATED
-                reload_urls.append(ServerPath(page.url).lstrip().posix())
-            self.render_pages()
+            Layout.invalidate(obj.full_path)
+            changes.keys.add(DependencyGraph.layout(obj.full_path))
 
-        self.log_reload(*reload_urls)
-        return reload_urls
-
-    def update_page(self, path: str):
+    def update_page(self, path: str, changes: Changes):
         """Update and rerender a given page."""
-        path = path.replace("\\", "/")
         obj = self.files.get(path, None)
 
         if obj is not None and isinstance(obj, Renderable):
-            obj.state = FileState.UPDATED
-            self.file_system.build_hierarchy()
-            self.render_pages()
+            changes.render(obj)
             self.log_update(path=obj.relative_url)
 
-        reload_urls = (
-            [ServerPath(obj.url).lstrip().posix()]
-            if obj is not None
-            else []
-        )
-        self.log_reload(*reload_urls)
-        return reload_urls
-
-    def update_component(self, path: str):
+    def update_component(self, path: str, changes: Changes):
         """Update a given component and all linked pages."""
-        path = path.replace("\\", "/")
         obj = self.components.get(path)
 
-        reload_urls = []
         if obj is not None and isinstance(obj, Component):
             self.phml.add((obj.cname, obj.full_path))
             self.log_update(cmpt=obj.cname)
-            for page in obj.linked_files:
-                page.state = FileState.UPDATED
-                reload_urls.append(ServerPath(page.url).lstrip().posix())
-            self.render_pages()
-
-        self.log_reload(*reload_urls)
-        return reload_urls
+            changes.keys.add(DependencyGraph.component(obj.cname))
 
-    def update_static(self, path: str):
+    def update_static(self, path: str, changes: Changes):
         """Update a given static file and re-write it to dest."""
-        path = path.replace("\\", "/")
         obj = self.files.get(path, None)
 
         if obj is None:
@@ -237,29 +530,19 @@ class Callbacks(LiveCallback):
 
         if obj is not None and isinstance(obj, Static):
             obj.state = FileState.UPDATED
-            self.write_static()
+            changes.static = True
             self.log_update(path=obj.relative_url)
 
-    def create_layout(self, path: str):
+    def create_layout(self, path: str, changes: Changes):
         """Update a given layout and all linked pages."""
-        path = path.replace("\\", "/")
         new_layout = Layout(path, ignore=CONFIG.site.source)
 
         self.file_system.add(new_layout)
         self.files[new_layout.full_path] = new_layout
-        self.file_system.build_hierarchy()
-        reload_urls = []
-        for page in new_layout.linked_files:
-            page.state = FileState.UPDATED
-            reload_urls.append(ServerPath(page.url).lstrip().posix())
-
-        self.render_pages()
-        self.log_reload(*reload_urls)
-        return reload_urls
+        changes.layouts = True
 
-    def create_page(self, path: str):
+    def create_page(self, path: str, changes: Changes):
         """Update and rerender a given page."""
-        path = path.replace("\\", "/")
         obj = Path(path)
         new_page = None
         if obj.suffix == ".phml":
@@ -269,25 +552,18 @@ class Callbacks(LiveCallback):
 
         if new_page is not None:
             self.file_system.add(new_page)
-            for file in self.file_system.renderable():
-                file.state = FileState.UPDATED
             self.files[new_page.full_path] = new_page
-            self.file_system.build_hierarchy()
-            self.render_pages()
-            self.log_create(path=new_page.relative_url)
+            self.file_system.assign_layout(new_page)
 
-        reload_urls = (
-            [ServerPath(new_page.url).lstrip().posix()]
-            if new_page is not None
-            else []
-        )
-
-        self.log_reload("**/*")
-        return ["**"]
+            # The new page, pages that read the nav sections listing it, and pages that link to it
+            changes.render(new_page)
+            changes.created.append(new_page)
+            changes.keys.update(DependencyGraph.links(new_page))
+            changes.nav = True
+            self.log_create(path=new_page.relative_url)
 
-    def create_component(self, path: str):
+    def create_component(self, path: str, changes: Changes):
         """Update a given component and all linked pages."""
-        path = path.replace("\\", "/")
         new_component = Component(path, ignore=CONFIG.site.components)
 
         self.component_files.add(new_component)
@@ -297,10 +573,13 @@ class Callbacks(LiveCallback):
             self.log_create(cmpt=new_component.cname)
         except Exception as error:
             self.logger.Error(str(error))
+            return
 
-    def create_static(self, path: str):
+        # Pages that used the tag before the component existed
+        changes.keys.add(DependencyGraph.component(new_component.cname))
+
+    def create_static(self, path: str, changes: Changes):
         """Update a given static file and re-write it to dest."""
-        path = path.replace("\\", "/")
         new_static = None
 
         if path.startswith(CONFIG.site.source):
@@ -314,72 +593,51 @@ class Callbacks(LiveCallback):
 
         if new_static is not None:
             self.log_create(path=new_static.relative_url)
-            self.write_static()
+            changes.static = True
+            changes.keys.update(DependencyGraph.links(new_static))
 
-    def remove_static(self, path: str):
+    def remove_static(self, path: str, changes: Changes):
         """Remove a static file and its 'rendered' file."""
-        path = path.replace("\\", "/")
         obj = self.files.pop(path, None)
         if obj is None:
             obj = self.statics.pop(path, None)
 
         if obj is not None and isinstance(obj, Static):
             obj.state = FileState.DELETED
-            self.write_static()
+            changes.static = True
+            changes.keys.update(DependencyGraph.links(obj))
             self.log_delete(path=obj.relative_url)
 
-    def remove_layout(self, path: str):
+    def remove_layout(self, path: str, changes: Changes):
         """Remove a given layout and update all linked pages."""
-        path = path.replace("\\", "/")
         obj = self.files.pop(path, None)
 
-        reload_urls = []
         if obj is not None and isinstance(obj, Layout):
-            for page in obj.linked_files:
-                page.state = FileState.UPDATED
-                reload_urls.append(ServerPath(page.url).lstrip().posix())
+            Layout.invalidate(obj.full_path)
             self.file_system.remove(obj.full_path)
-            self.file_system.build_hierarchy()
-            self.render_pages()
+            changes.layouts = True
 
-        self.log_reload(*reload_urls)
-        return reload_urls
-
-    def remove_page(self, path: str):
+    def remove_page(self, path: str, changes: Changes):
         """Remove a given page."""
-        path = path.replace("\\", "/")
         obj = self.files.pop(path, None)
 
         if obj is not None and isinstance(obj, Renderable):
-            for file in self.file_system.renderable():
-                file.state = FileState.UPDATED
             obj.state = FileState.DELETED
-            self.render_pages()
-            self.log_delete(path=obj.relative_url)
-
-        reload_urls = (
-            [ServerPath(obj.url).lstrip().posix()]
-            if obj is not None
-            else []
-        )
 
-        self.log_reload("**/*")
-        return ["**"]
+            # The removed page, pages that read the nav sections listing it, and pages that
+            # link to it
+            changes.render(obj)
+            changes.keys.update(DependencyGraph.navs(self.nav, obj))
+            changes.keys.update(DependencyGraph.links(obj))
+            changes.nav = True
+            self.log_delete(path=obj.relative_url)
 
-    def remove_component(self, path: str):
+    def remove_component(self, path: str, changes: Changes):
         """Remove a given component and update linked pages."""
-        path = path.replace("\\", "/")
         obj = self.components.pop(path, None)
 
-        reload_urls = []
         if obj is not None and isinstance(obj, Component):
             self.log_delete(cmpt=obj.cname)
-            for page in obj.linked_files:
-                page.state = FileState.UPDATED
-                reload_urls.append(ServerPath(page.url).lstrip().posix())
             self.phml.remove(obj.cname)
             self.component_files.remove(obj.full_path)
-            self.render_pages()
-
-        self.log_reload(*reload_urls)
-        return reload_urls
+            changes.keys.add(DependencyGraph.component(obj.cname))
@@ -3,21 +3,9 @@ import re
 from functools import cache
 from typing import Any, Callable
 
-from markdown import Markdown
+from phml.core import AST, PHML
 
 from mophidian.config import CONFIG
-# from mophidian.file_system.markdown_extensions import _RelativePathExtension
-
-
-# extensions=[
-#     _RelativePathExtension(None, None, None),
-#     *
-# ],
-
-MARKDOWN = Markdown(
-    extensions=CONFIG.markdown.extensions,
-    extension_configs=CONFIG.markdown.extension_configs,
-)
 
 def filter_sort(
     collection,
@@ -111,6 +99,60 @@ def html(*meta: str) -> str:
 </html>\
 """
 
+def clone(node: Any) -> Any:
+    """Fast structural copy of a phml AST or node.
+
+    Unlike `deepcopy`, only the tree structure and each node's properties and context are
+    copied. Everything else, like positions and text values, is shared with the original.
+    """
+
+    if isinstance(node, AST):
+        return AST(clone(node.tree))
+    return _clone(node, None)
+
+def _clone(node: Any, parent: Any) -> Any:
+    new = object.__new__(node.__class__)
+    new.__dict__.update(node.__dict__)
+
+    if "parent" in new.__dict__:
+        new.parent = parent
+    if isinstance(new.__dict__.get("properties"), dict):
+        new.properties = dict(node.properties)
+    if isinstance(new.__dict__.get("context"), dict):
+        new.context = dict(node.context)
+    if isinstance(new.__dict__.get("children"), list):
+        new.children = [_clone(child, new) for child in node.children]
+    return new
+
+def tag_names(node: Any) -> list[str]:
+    """Unique element tag names in a phml AST or node, in document order. Collected with a
+    single walk of the tree.
+    """
+
+    if isinstance(node, AST):
+        node = node.tree
+
+    tags = {}
+    stack = [node]
+    while len(stack) > 0:
+        current = stack.pop()
+        if getattr(current, "type", None) == "element":
+            tags[current.tag] = None
+        children = getattr(current, "children", None)
+        if isinstance(children, list):
+            stack.extend(reversed(children))
+    return list(tags)
+
+@cache
+def _shell(*meta: str) -> AST:
+    return PHML().parse(html(*meta)).ast
+
+def shell(*meta: str) -> AST:
+    """The parsed base html document. The document is only parsed once and each call
+    gets it's own clone.
+    """
+    return clone(_shell(*meta))
+
 META = {
     "charset": '<meta charset="UTF-8">',
     "http_equiv": '<meta http-equiv="X-UA-Compatible" content="IE=edge">',
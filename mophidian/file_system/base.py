@@ -1,7 +1,8 @@
 from pathlib import Path
 from re import sub
+from typing import Callable
 from phml.core import AST
-from phml.utilities import query
+from phml.core.nodes import Element
 
 from mophidian.config import CONFIG
 from mophidian.core.util import REGEX
@@ -23,18 +24,91 @@ def build_attributes(attributes: dict) -> dict:
             props[attribute] = "yes" if attributes[attribute] else "no"
     return props
 
-def apply_attribute_configs(ast: AST) -> AST:
-    """Apply attributes defined in the config to html and body tags."""
-    html = query(ast, "html")
-    body = query(ast, "body")
-
-    if html is not None:
-        html.properties.update(build_attributes(CONFIG.build.html))
-
-    if body is not None:
-        body.properties.update(build_attributes(CONFIG.build.body))
-
-    return ast
+class Rewriter:
+    """Visitor that applies many rewrites to the elements of a phml AST in a single traversal.
+
+    Rewrites are registered for a specific tag, or for every element when no tag is given.
+    They are called with each matching element in document order. A rewrite that returns
+    True is finished and is skipped for the rest of the traversal.
+
+    Example:
+        rewriter = Rewriter()
+
+        @rewriter.add("html")
+        def html_lang(node: Element) -> bool:
+            node["lang"] = "en"
+            return True
+    """
+
+    def __init__(self) -> None:
+        self.rewrites: list[tuple[str | None, Callable[[Element], bool | None]]] = []
+
+    def add(self, tag: str | None = None) -> Callable:
+        """Decorator to register a rewrite for elements with the given tag."""
+
+        def decorator(rewrite: Callable[[Element], bool | None]):
+            self.rewrites.append((tag, rewrite))
+            return rewrite
+
+        return decorator
+
+    def visit(self, ast: AST) -> AST:
+        """Apply all the rewrites to the AST."""
+
+        active = list(self.rewrites)
+        stack = [ast.tree]
+        while len(stack) > 0 and len(active) > 0:
+            node = stack.pop()
+            if isinstance(node, Element):
+                for rewrite in list(active):
+                    if (rewrite[0] is None or rewrite[0] == node.tag) and rewrite[1](node):
+                        active.remove(rewrite)
+            if isinstance(getattr(node, "children", None), list):
+                stack.extend(reversed(node.children))
+        return ast
+
+pre_compile = Rewriter()
+"""Rewrites applied to every page before it is compiled."""
+
+post_render = Rewriter()
+"""Rewrites applied to every page after it is compiled."""
+
+@pre_compile.add("html")
+def html_attributes(node: Element) -> bool:
+    """Apply attributes defined in the config to the html tag."""
+    node.properties.update(build_attributes(CONFIG.build.html))
+    return True
+
+@pre_compile.add("body")
+def body_attributes(node: Element) -> bool:
+    """Apply attributes defined in the config to the body tag."""
+    node.properties.update(build_attributes(CONFIG.build.body))
+    return True
+
+@post_render.add("link")
+def rss_link(node: Element) -> bool:
+    """Point the rss link at the generated feed."""
+    if not CONFIG.build.rss:
+        return True
+
+    if "rss" in str(node.properties.get("type", "")):
+        node.properties.update({
+            "type": "application/rss+xml",
+            "rel": "alternate",
+            "href": Path(CONFIG.site.base_url).joinpath(CONFIG.site.root, "feed.xml")
+        })
+        return True
+    return False
+
+@post_render.add()
+def root_links(node: Element):
+    """Append the root to href and src links that start with `@`."""
+    root = "/" + CONFIG.site.root.strip("/")
+    for link_type in ["href", "src", "xlink:href"]:
+        link = node.properties.get(link_type)
+        if isinstance(link, str) and link.startswith("@") and not link.startswith(root):
+            new_link = link.lstrip("@").replace('\\', '/').lstrip('/')
+            node[link_type] = f"{root}/{new_link}"
 
 class Node:
     """Base file system node."""
@@ -45,6 +119,9 @@ class Node:
     path: str
     """Full path after the root directory."""
 
+    container: "Node | None"
+    """The directory or group that this node was added to."""
+
     def __init__(self, path: str, ignore: str = "") -> None:
         path = path.replace("\\", "/").strip("/")
         self.root, self.path = ignore.replace("\\", "/"), sub(ignore, "", path)
@@ -60,6 +137,7 @@ class Node:
                 break
         self.full_path = path
         self.children = None
+        self.container = None
 
     @property
     def parents(self) -> list[str]:
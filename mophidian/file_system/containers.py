@@ -1,6 +1,6 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import Callable, Iterator
+from typing import Any, Callable, Iterable, Iterator
 
 from mophidian.core.util import REGEX
 from .base import Node
@@ -35,6 +35,9 @@ def first(condition: Callable, collection: list | dict | tuple) -> Any:
                 return value
     return None
 
+KINDS = (Page, Layout, Static, Renderable, Markdown, Component)
+"""File types that containers keep a registry of."""
+
 class Container(Node):
     """Directory/Group representation of a file system node."""
 
@@ -49,6 +52,53 @@ class Container(Node):
         self.children = []
         self.name = name
 
+        # Indexes of the files and containers added through this container
+        self._containers: dict[str, Container] = {}
+        self._full_paths: dict[str, File] = {}
+        self._paths: dict[str, File] = {}
+        self._urls: dict[str, list[File]] = {}
+
+        # Registries of every file in this containers sub tree, in total and by kind
+        self._files: dict[str, File] = {}
+        self._kinds: dict[type, dict[str, File]] = {kind: {} for kind in KINDS}
+        self._cnames: dict[str, list[Component]] = {}
+
+    def _register(self, file: File):
+        """Add a file to this containers registries."""
+        self._files[file.full_path] = file
+        for kind in KINDS:
+            if isinstance(file, kind):
+                self._kinds[kind][file.full_path] = file
+        if isinstance(file, Component):
+            self._cnames.setdefault(file.cname, []).append(file)
+
+    def _unregister(self, file: File):
+        """Remove a file from this containers registries."""
+        self._files.pop(file.full_path, None)
+        for registry in self._kinds.values():
+            registry.pop(file.full_path, None)
+        if isinstance(file, Component) and file.cname in self._cnames:
+            self._cnames[file.cname] = [c for c in self._cnames[file.cname] if c is not file]
+            if len(self._cnames[file.cname]) == 0:
+                self._cnames.pop(file.cname)
+
+    def _index(self, file: File):
+        """Add a file to the full path, path, and relative url indexes."""
+        self._full_paths[file.full_path.strip("/")] = file
+        self._paths[file.path.strip("/")] = file
+        self._urls.setdefault(file.relative_url.strip("/"), []).append(file)
+
+    def _unindex(self, file: File):
+        """Remove a file from the full path, path, and relative url indexes."""
+        self._full_paths.pop(file.full_path.strip("/"), None)
+        self._paths.pop(file.path.strip("/"), None)
+
+        url = file.relative_url.strip("/")
+        if file in self._urls.get(url, []):
+            self._urls[url] = [f for f in self._urls[url] if f is not file]
+            if len(self._urls[url]) == 0:
+                self._urls.pop(url)
+
     def remove(self, full_path: str):
         """Remove a specific file in file system given the files full path.
 
@@ -58,26 +108,71 @@ class Container(Node):
         Raises:
             Exception: When no file is found that matches the full path.
         """
-        def iterate_children(container: Container) -> bool:
-            for child in container.children:
-                if isinstance(child, File) and child.full_path == full_path:
-                    container.children.remove(child)
-                    return True
-                elif isinstance(child, Container):
-                    result = iterate_children(child)
-                    if result:
-                        if len(child.children) == 0:
-                            container.children.remove(child)
-                        return result
-            return False
+        self.remove_many([full_path])
+
+    def remove_many(self, full_paths: Iterable[str]):
+        """Remove many files from the file system in a single pass. Groups and directories
+        left empty are pruned.
+
+        Files are found through the full path index and removed by following their parent
+        references, so each removal costs O(depth) and each affected container's children
+        are only rebuilt once.
+
+        Args:
+            full_paths (Iterable[str]): The full paths of the files to remove.
+
+        Raises:
+            Exception: When no file is found that matches one of the full paths.
+        """
+
+        files = []
+        for full_path in full_paths:
+            file = self._full_paths.get(full_path.strip("/"))
+            if file is None:
+                raise Exception(f"No file found for full path {full_path!r}")
+            files.append(file)
+
+        # Children to drop from each affected container, keyed by the containers id
+        removed: dict[int, tuple[Container, set[int]]] = {}
+        for file in files:
+            self._unindex(file)
+            current = file.container
+            removed.setdefault(id(current), (current, set()))[1].add(id(file))
+            while current is not None:
+                current._unregister(file)
+                if current is self:
+                    break
+                current = current.container
+
+        # Deepest containers first so emptied containers can be pruned from their parents
+        pending = sorted(removed.values(), key=lambda c: c[0].path.count("/"), reverse=True)
+        while len(pending) > 0:
+            container, children = pending.pop(0)
+            container.children = [
+                child for child in container.children if id(child) not in children
+            ]
+
+            parent = container.container
+            if len(container.children) == 0 and container is not self and parent is not None:
+                self._containers.pop(container.path.strip("/"), None)
+                container.container = None
+                for entry in pending:
+                    if entry[0] is parent:
+                        entry[1].add(id(container))
+                        break
+                else:
+                    pending.append((parent, {id(container)}))
+                    pending.sort(key=lambda c: c[0].path.count("/"), reverse=True)
 
-        if not iterate_children(self):
-            raise Exception(f"No file found for full path {full_path!r}")
+        for file in files:
+            file.container = None
 
     def find(self, path: str) -> File | None:
         """Get a file based on it's full source path, path with root stripped, and relative url.
         First the full path is checked, then the path, then the relative url.
 
+        Files added through this container are found with constant time index lookups.
+
         Args:
             path (str): The path to the file.
 
@@ -86,7 +181,16 @@ class Container(Node):
         """
 
         path = path.strip().strip("/")
-        
+
+        if len(self._full_paths) > 0:
+            if path in self._full_paths:
+                return self._full_paths[path]
+            if path in self._paths:
+                return self._paths[path]
+            if path in self._urls:
+                return self._urls[path][0]
+            return None
+
         result = None
         for file in self:
             if file.full_path.strip("/") == path:
@@ -203,64 +307,47 @@ class Container(Node):
                     break
         return None
 
-    def add(self, item: File | Container):
-        """Add a file or directory to the current directory.
+    def add(self, item: File):
+        """Add a file to the current directory.
+
+        Missing directories and groups along the files path are created. Existing ones
+        are found through the containers index so adding costs O(depth) lookups. Containers
+        are never added directly, they are created from the paths of the files in them.
 
         Args:
-            item (File | Container): The item to add to the directory
+            item (File): The file to add to the directory
+
+        Raises:
+            Exception: When a file already exists at the items full path.
         """
 
+        if item.full_path.strip("/") in self._full_paths:
+            raise Exception(f"Duplicate file at path {item.full_path!r}")
+
         current = self
-        path = [item.root, *[i for i in item.path.split("/") if i.strip() != ""]]
-        for i, segment in enumerate(path):
-            if Path('/'.join(path[: i + 1])).is_file():
-                if len([
-                    c for c in current.children
-                    if isinstance(c, File)
-                    and c.full_path == item.full_path
-                ]) > 0:
-                    raise Exception(f"Duplicate file at path {item.full_path!r}")
-
-                current.children.append(item)
-            elif '/'.join(path[: i + 1]) != item.root:
-                new_path = Path(item.root).joinpath(*path[1: i + 1])
+        current._register(item)
+        segments = [i for i in item.path.split("/") if i.strip() != ""]
+        key = ""
+        for segment in segments[:-1]:
+            key = f"{key}/{segment}" if key != "" else segment
+            container = self._containers.get(key)
+
+            # If valid, append a new group or directory
+            if container is None:
+                new_path = Path(item.root).joinpath(*key.split("/")).as_posix()
                 if REGEX["group"]["name"].match(segment) is not None:
-                    found = False
-                    if current.path.strip("/") == new_path.as_posix():
-                        found = True
-                    else:
-                        for group in [
-                            child for child in current.children if isinstance(child, Group)
-                        ]:
-                            if group.path == '/'.join(path[1 : i + 1]) + "/":
-                                current = group
-                                found = True
-                                break
-
-                    # If valid, append a new group
-                    if not found:
-                        new = Group(new_path.as_posix(), item.root)
-                        current.children.append(new)
-                        current = new
+                    container = Group(new_path, item.root)
                 else:
-                    found = False
-
-                    if current.path.strip("/") == new_path:
-                        found = True
-                    else:
-                        for directory in [
-                            child for child in current.children if isinstance(child, Directory)
-                        ]:
-                            if directory.path.strip("/") == '/'.join(path[1 : i + 1]):
-                                current = directory
-                                found = True
-                                break
-
-                    # If valid, append a new directory
-                    if not found:
-                        new = Directory(new_path.as_posix(), item.root)
-                        current.children.append(new)
-                        current = new
+                    container = Directory(new_path, item.root)
+                container.container = current
+                current.children.append(container)
+                self._containers[key] = container
+            current = container
+            current._register(item)
+
+        item.container = current
+        current.children.append(item)
+        self._index(item)
         return current
 
     def build_nav(self) -> Nav:
@@ -293,6 +380,19 @@ class Container(Node):
         unwrap_indecies(nav, nav_indexes)
         return nav
 
+    def assign_layout(self, page: Renderable):
+        """Find the layout for a page and link the page to every layout it uses."""
+
+        if page.inherits:
+            page.layout = self.find_layout_by_name(page.inherit_from)
+        else:
+            page.layout = self.find_layout_by_path(page.parents)
+
+        layout = page.layout
+        while layout is not None:
+            layout.link_file(page)
+            layout = layout.parent
+
     def build_hierarchy(self):
         """Build the relationships between layouts and pages."""
 
@@ -340,16 +440,7 @@ class Container(Node):
             _containers = [cont for cont in current.children if isinstance(cont, Container)]
 
             for page in _pages:
-                if page.inherits:
-                    page.layout = self.find_layout_by_name(page.inherit_from)
-                else:
-                    page.layout = self.find_layout_by_path(page.parents)
-
-                # Link the page to all layouts that it uses
-                layout = page.layout
-                while layout is not None:
-                    layout.link_file(page)
-                    layout = layout.parent
+                self.assign_layout(page)
 
             # Recursively process containers
             for container in _containers:
@@ -389,39 +480,35 @@ class Container(Node):
 
     def pages(self) -> Iterator[Page]:
         """Iterator of only pages in the file system."""
-        for file in self:
-            if isinstance(file, Page):
-                yield file
+        yield from list(self._kinds[Page].values())
 
     def layouts(self) -> Iterator[Layout]:
         """Iterator of only layouts in the file system."""
-        for file in self:
-            if isinstance(file, Layout):
-                yield file
+        yield from list(self._kinds[Layout].values())
 
     def static(self) -> Iterator[Static]:
         """Iterator of only static files in the file system."""
-        for file in self:
-            if isinstance(file, Static):
-                yield file
+        yield from list(self._kinds[Static].values())
 
     def renderable(self) -> Iterator[Renderable]:
         """Iterator of only renderable files in the file system."""
-        for file in self:
-            if isinstance(file, Renderable):
-                yield file
+        yield from list(self._kinds[Renderable].values())
 
     def markdown(self) -> Iterator[Markdown]:
         """Iterator of only markdown files in the file system."""
-        for file in self:
-            if isinstance(file, Markdown):
-                yield file
- 
+        yield from list(self._kinds[Markdown].values())
+
     def components(self) -> Iterator[Component]:
         """Iterator of only component files in the file system."""
-        for file in self:
-            if isinstance(file, Component):
-                yield file
+        yield from list(self._kinds[Component].values())
+
+    def components_by_name(self, cnames: Iterable[str]) -> list[Component]:
+        """Components in the file system matching the given component names."""
+        return [
+            component
+            for cname in cnames
+            for component in self._cnames.get(cname, [])
+        ]
 
     def print(self, depth: int = 0) -> str:
         """Colored terminal representation of the container."""
@@ -434,17 +521,10 @@ class Container(Node):
         return out
 
     def __len__(self) -> int:
-        return len(list(self))
-    
+        return len(self._files)
+
     def __iter__(self):
-        def iterate_children(container: Container):
-            for child in container.children:
-                if isinstance(child, File):
-                    yield child
-                else:
-                    yield from iterate_children(child)
-            
-        yield from iterate_children(self)
+        yield from list(self._files.values())
 
 
 class Group(Container):
@@ -1,9 +1,11 @@
 from __future__ import annotations
 from dataclasses import dataclass
+from io import StringIO
 from functools import cached_property
 
 from pathlib import Path
-from shutil import copyfile, SameFileError # For copying static files
+import os
+from shutil import copy2, copystat, SameFileError # For copying static files
 from typing import TYPE_CHECKING, Any
 from re import match, sub
 
@@ -11,10 +13,10 @@ import frontmatter
 
     
 from phml.core import AST, PHML, substitute_component
+from phml.core.nodes import Element
 from phml.utilities import ( # Used to parse the phml content and manipulate it's ast
     check,
     cmpt_name_from_path,
-    find,
     query,
     query_all,
     remove_nodes,
@@ -28,9 +30,18 @@ from saimll import SAIML, Logger # Custom logging
 
 import mophidian
 from mophidian.config import CONFIG
-from mophidian.core.util import REGEX, PAGE_IGNORE, html, title, url, MARKDOWN, filter_sort
-from .markdown_extensions import _RelativePathExtension
-from .base import apply_attribute_configs, build_attributes, Node
+from mophidian.core.markdown import MARKDOWN_POOL
+from mophidian.core.util import (
+    REGEX,
+    PAGE_IGNORE,
+    title,
+    url,
+    filter_sort,
+    shell,
+    tag_names,
+)
+from .markdown_extensions import LinkResolver
+from .base import build_attributes, pre_compile, post_render, Node
 
 if TYPE_CHECKING:
     from .containers import Directory
@@ -46,7 +57,8 @@ __all__ = [
     "TOC",
     "Anchor",
     "Nav",
-    "FileState"
+    "FileState",
+    "StaticMode",
 ]
 
 global_expose = {
@@ -55,6 +67,48 @@ global_expose = {
 phml = PHML()
 phml.expose(filter_sort=filter_sort)
 
+layout_chains: dict[tuple[tuple[str, int], ...], tuple[list[dict], str | None]] = {}
+"""Parsed and validated layout components keyed by the paths and modified times of the
+layouts in the chain."""
+
+def merge_head(head: Element, nodes: list):
+    """Merge the head elements from layouts and pages into the base document's head. Later
+    elements take precedence over earlier ones.
+
+    * `meta` and `title` elements replace the element in the head with the same tag and
+    identifying attributes, every attribute other than `content`. If there is no such element
+    they are appended.
+    * Other elements, except `style` and `script`, are appended unless an element with the
+    same tag and attributes already exists.
+    * Everything else is appended.
+
+    Elements in the head are indexed by their tag and attribute set so each node is merged
+    with a single dictionary lookup.
+    """
+
+    def key(node: Element) -> tuple[str, frozenset]:
+        if node.tag in ["meta", "title"]:
+            attributes = {k: v for k, v in node.properties.items() if k != "content"}
+        else:
+            attributes = node.properties
+        return node.tag, frozenset((k, str(v)) for k, v in attributes.items())
+
+    positions: dict[tuple[str, frozenset], int] = {}
+    for position, child in enumerate(head.children):
+        if isinstance(child, Element):
+            positions.setdefault(key(child), position)
+
+    for node in nodes:
+        node.parent = head
+        if check(node, "element") and node.tag not in ["style", "script"]:
+            position = positions.get(key(node))
+            if position is not None:
+                if node.tag in ["meta", "title"]:
+                    head.children[position] = node
+                continue
+            positions[key(node)] = len(head.children)
+        head.children.append(node)
+
 @dataclass
 class FileState:
     """File's state
@@ -68,6 +122,35 @@ class FileState:
     UPDATED: int = 1
     DELETED: int = 2
     
+@dataclass
+class StaticMode:
+    """How static files are placed in the output directory.
+
+    Modes:
+        COPY: Copy the file, keeping it's modified time
+        HARDLINK: Hard link the file. Falls back to copying across devices
+        REFLINK: Copy on write clone of the file. Falls back to copying when unsupported
+        SYMLINK: Symbolic link to the source file
+    """
+    COPY: str = "copy"
+    HARDLINK: str = "hardlink"
+    REFLINK: str = "reflink"
+    SYMLINK: str = "symlink"
+
+def reflink(src: Path, dest: Path):
+    """Clone a file with copy on write. Raises OSError if the platform or file system
+    does not support it.
+    """
+    try:
+        import fcntl
+    except ImportError as error:
+        raise OSError("Reflinks are not supported on this platform") from error
+
+    ficlone = 0x40049409
+    with open(src, "rb") as source, open(dest, "wb") as clone:
+        fcntl.ioctl(clone.fileno(), ficlone, source.fileno())
+    copystat(src, dest)
+
 class Anchor:
     """Link representation of a header tag."""
 
@@ -251,6 +334,11 @@ class File(Node):
         """Destination path of the file given a destination directory."""
         return Path(dest_dir).joinpath(self._dest.strip("/"))
 
+    @property
+    def relative_dest(self) -> str:
+        """Destination path of the file relative to the destination directory."""
+        return self._dest.strip("/")
+
     def print(self, depth: int = 0) -> str:
         """Colored terminal representation of the file."""
         out = f"{' ' * depth}\x1b[34m{self.__class__.__name__}\x1b[0m > \
@@ -283,10 +371,18 @@ class Renderable(File):
     components: list[Component]
     """List of used components. For live updates only."""
 
+    tags: list[str]
+    """Names of the tags used by the page before it was compiled. For live updates only."""
+
+    globals: list[str]
+    """Keys of the exposed globals the page read while it was rendered. For live updates only."""
+
     def __init__(self, path: str, ignore: str = "") -> None:
         super().__init__(path, ignore)
         self.layout = None
         self.components = []
+        self.tags = []
+        self.globals = []
         self.title = self._make_title()
         self.next = None
         self.prev = None
@@ -301,6 +397,19 @@ class Renderable(File):
         for component in self.components:
             component.unlink_file(self)
 
+    def link_components(self, components: list[Component]):
+        """Link the components used by the page. Components that are no longer used are unlinked."""
+
+        for component in self.components:
+            if component not in components:
+                component.unlink_file(self)
+
+        self.components = []
+        for component in components:
+            if component not in self.components:
+                component.link_file(self)
+                self.components.append(component)
+
     def _make_title(self) -> str:
         name = Path(self._dest).parent.as_posix().split("/")[-1]
         if name.strip() in ["", "."]:
@@ -315,6 +424,54 @@ class Renderable(File):
         """Render the given file to it's appropriate html."""
         raise Exception("Do not use base class Renderable's render function")
 
+    def compose(
+        self,
+        phml: PHML,
+        ast: AST,
+        page_ast: AST,
+        component_files: Directory,
+        head: list | None = None,
+        **kwargs,
+    ) -> str:
+        """Place the page in the base html document, compile it, and render it to html.
+
+        Args:
+            phml (PHML): The compiler. Its ast must be the base html document `ast`.
+            ast (AST): The base html document with a `<Slot />` for the page.
+            page_ast (AST): The page wrapped in it's layouts. Its `<head>` elements are merged
+                into the document's head.
+            component_files (Directory): The components to link the page to.
+            head (list | None): Extra elements to insert into the document's head.
+            **kwargs: Variables to expose to the phml compiler.
+        """
+
+        headers = query_all(page_ast, "head")
+        remove_nodes(page_ast, {"tag": "head"}, strict=False)
+
+        head_children = []
+        for header in headers:
+            head_children.extend(header.children)
+
+        document_head = query(ast, "head")
+        if document_head is not None:
+            for node in head or []:
+                document_head.insert(-1, node)
+            merge_head(document_head, head_children)
+            replace_node(ast.tree, {"tag": "head"}, document_head)
+        replace_node(ast.tree, {"tag": "Slot"}, page_ast.children)
+
+        # Find all components
+        self.tags = tag_names(ast)
+        self.link_components(component_files.components_by_name(self.tags))
+
+        # The config's html and body attributes are applied before compiling so layouts and
+        # components can still read or override them
+        pre_compile.visit(ast)
+        ast = phml.compile(**kwargs)
+
+        phml.ast = post_render.visit(ast)
+        return phml.render(**kwargs)
+
     def __repr__(self) -> str:
         next = self.next.relative_url if self.next is not None else "None"
         prev = self.prev.relative_url if self.prev is not None else "None"
@@ -327,7 +484,7 @@ class Page(Renderable):
     def ast(self) -> AST:
         page_ast = phml.load(Path(self.full_path)).ast
 
-        if query(page_ast, "html") or query(page_ast, "body"):
+        if not {"html", "body"}.isdisjoint(tag_names(page_ast)):
             Logger.warning(f"<{SAIML.parse(f'[@Fgreen]{self.full_path!r}')}> Page must be a component not full pages")
 
         return page_ast
@@ -337,80 +494,45 @@ class Page(Renderable):
         kwargs.pop("static_files", None)
         kwargs.pop("page_files", None)
 
-        ast = phml.parse(html(*CONFIG.site.meta_tags)).ast
+        ast = shell(*CONFIG.site.meta_tags)
+        phml.ast = ast
         if self.layout is not None:
             page_ast = self.layout.render(self.ast, **kwargs)
         else:
             page_ast = self.ast
 
-        headers = query_all(page_ast, "head")
+        return self.compose(phml, ast, page_ast, component_files, **kwargs)
 
-        remove_nodes(page_ast, {"tag": "head"}, strict=False)
-        head_children = []
-        for head in headers:
-            head_children.extend(head.children)
-
-        head = query(ast, "head")
-
-        if head is not None:
-            for node in head_children:
-                node.parent = head
-                exist = '[{}]'
-                exist_equal = '[{}={}]'
-                if check(node, "element") and node.tag in ["meta", "title"]:
-                    old_tag = query(
-                        head,
-                        f"{node.tag}{''.join(exist.format(key) for key in node.properties.keys())}",
-                    )
-                    if node is not None:
-                        replace_node(head, lambda n, i, p: n == old_tag, node)
-                    else:
-                        head.children.append(node)
-                elif check(node, "element") and node.tag not in ["style", "script"]:
-                    if (
-                        query(
-                            head,
-                            f"{node.tag}\
-{''.join(exist_equal.format(key, value) for key, value in node.properties.items())}",
-                        )
-                        is None
-                    ):
-                        head.children.append(node)
-                else:
-                    # replace or append
-                    head.children.append(node)
-            replace_node(ast.tree, {"tag": "head"}, head)
-        replace_node(ast.tree, {"tag": "Slot"}, page_ast.children)
+@dataclass
+class MarkdownSource:
+    """The parsed contents of a markdown file."""
 
-        # Find all components
-        for component in component_files.components():
-            if find(ast, {"tag": component.cname}) is not None:
-                component.link_file(self)
-                self.components.append(component)
+    meta: dict[str, Any]
+    """Frontmatter meta data."""
 
-        ast = apply_attribute_configs(ast)
-        ast = phml.compile(**kwargs)
+    content: str
+    """Markdown content after the frontmatter."""
 
-        if CONFIG.build.rss:
-            rss_link = query(ast, "link[type*=rss]")
-            if rss_link is not None:
-                rss_link.properties.update({
-                    "type": "application/rss+xml",
-                    "rel": "alternate",
-                    "href": Path(CONFIG.site.base_url).joinpath(CONFIG.site.root, "feed.xml")
-                })
-
-        # Append root to href and src links
-        root = "/" + CONFIG.site.root.strip("/")
-        for link_type in ["href", "src", "xlink:href"]:
-            for node in query_all(ast, f"[{link_type}^=@]"):
-                if not node[link_type].startswith(root):
-                    new_link = node[link_type].lstrip("@").replace('\\', '/').lstrip('/')
-                    node[link_type] = f"{root}/{new_link}"
+    heading: str | None
+    """Text of the first heading in the file. None if the file has no heading."""
 
-        phml.ast = ast
+def first_heading(text: str) -> str | None:
+    """Find the text of the first `#` or `===` style heading. Lines are only scanned up to
+    the first heading.
+    """
 
-        return phml.render(**kwargs)
+    previous = ""
+    for line in StringIO(text):
+        if line.strip() != "":
+            header = match(r"(?P<hash>\s*# *.+)|(?P<block>=+)", line)
+            if header is not None:
+                header = header.groupdict()
+                if header["hash"] is not None and header["hash"].strip() != "":
+                    return sub(r" *# *", "", header["hash"]).strip()
+                if header["block"] is not None and previous.strip() != "":
+                    return previous.strip()
+        previous = line
+    return None
 
 class Markdown(Renderable):
     """Markdown file representation. These files are rendered with the markdown module
@@ -427,7 +549,7 @@ class Markdown(Renderable):
         super().__init__(path, ignore)
         self.meta = self.parse_file()[0]
         self.toc = TOC()
-        self.relative_path_extension = None
+        self.links: LinkResolver | None = None
 
     def build_dest(self):
         if "readme" in Path(self._dest).name.lower():
@@ -457,25 +579,9 @@ class Markdown(Renderable):
         self.toc = result
 
     def _make_title(self) -> str:
-
-        with open(self.full_path, "r", encoding="utf-8") as mfile:
-            lines = mfile.readlines()
-            for i, line in enumerate(lines):
-                if line.strip() != "":
-                    header = match(r"(?P<hash>\s*# *.+)|(?P<block>=+)", line)
-                    if header is not None:
-                        header = header.groupdict()
-                        if (
-                            header["hash"] is not None
-                            and header["hash"].strip() != ""
-                        ):
-                            return sub(r" *# *", "", header["hash"]).strip()
-                        if (
-                            header["block"] is not None
-                            and i > 0
-                            and lines[i-1].strip() != ""
-                        ):
-                            return lines[i-1].strip()
+        heading = self.read().heading
+        if heading is not None:
+            return heading
 
         name = Path(self._dest).parent.as_posix().rsplit("/", 1)[-1]
         if name.strip() in ["", "."]:
@@ -486,25 +592,40 @@ class Markdown(Renderable):
 
         return title(tokanize_name(name))
 
+    def read(self) -> MarkdownSource:
+        """Read and parse the markdown file. The file is only read again after it's modified
+        time or size changes.
+        """
+
+        try:
+            stat = os.stat(self.full_path)
+            key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            key = None
+
+        cached = getattr(self, "_source", None)
+        if key is None or cached is None or cached[0] != key:
+            with open(Path(self.full_path), "r", encoding="utf-8") as markdown_file:
+                text = markdown_file.read()
+            post = frontmatter.loads(text)
+            cached = (key, MarkdownSource(post.metadata, post.content, first_heading(text)))
+            self._source = cached
+        return cached[1]
+
     def parse_file(self) -> tuple[dict, str]:
-        with open(Path(self.full_path), "r", encoding="utf-8") as markdown_file:
-            post = frontmatter.load(markdown_file)
-            return post.metadata, post.content
+        source = self.read()
+        return dict(source.meta), source.content
 
     def ast(self, content: str) -> AST:
         # save meta data as locals for later
-        content = MARKDOWN.reset().convert(content)
-
-        self.parse_toc(getattr(MARKDOWN, 'toc_tokens', []))
+        result = MARKDOWN_POOL.convert(content, self.links)
 
-        # parse resulting html into phml parser
-        ast = phml.parse(content).ast
+        self.parse_toc(result.toc_tokens)
 
         # Get the attributes for the wrapper from the config
         props: dict[str, str] = build_attributes(CONFIG.markdown.wrapper.attributes)
 
-        ast.tree = p(None, p(CONFIG.markdown.wrapper.tag, props, *ast.tree.children))
-        return ast
+        return AST(p(None, p(CONFIG.markdown.wrapper.tag, props, *result.tree.children)))
 
     def render(self, phml: PHML, page_files: Directory, static_files: Directory, component_files: Directory, **kwargs):
         """Render the markdown file into a full html page. Apply the plugins
@@ -516,11 +637,12 @@ class Markdown(Renderable):
             **kwargs: Additional variables to expose to the phml compiler.
         """
         self.meta, content = self.parse_file()
-        ast = phml.parse(html(*CONFIG.site.meta_tags)).ast
+        ast = shell(*CONFIG.site.meta_tags)
+        phml.ast = ast
 
-        self.relative_path_extension = _RelativePathExtension(self, page_files, static_files)
+        self.links = LinkResolver(self, page_files, static_files)
 
-        self._make_title()
+        self.title = self._make_title()
         page_title = self.meta.get("title", None)
 
         addons = {
@@ -537,94 +659,24 @@ class Markdown(Renderable):
             page_ast = self.ast(content)
 
 
-        headers = query_all(page_ast, "head")
-
-        remove_nodes(page_ast, {"tag": "head"}, strict=False)
-
-        head_children = []
-        for head in headers:
-            head_children.extend(head.children)
-
-        head = query(ast, "head")
-        if head is not None:
-            if CONFIG.markdown.pygmentize.highlight:
-                if (
-                    page_files.find(CONFIG.markdown.pygmentize.path) is None
-                    and static_files.find(CONFIG.markdown.pygmentize.path) is None
-                ):
-                    if not mophidian.states["markdown_code_highlight_warned"]:
-                        Logger.warning(
-                            "Markdown code highlighting requires a pygmentize css file. \
+        stylesheets = []
+        if CONFIG.markdown.pygmentize.highlight:
+            if (
+                page_files.find(CONFIG.markdown.pygmentize.path) is None
+                and static_files.find(CONFIG.markdown.pygmentize.path) is None
+            ):
+                if not mophidian.states["markdown_code_highlight_warned"]:
+                    Logger.warning(
+                        "Markdown code highlighting requires a pygmentize css file. \
 Use `moph highlight` to create that file."
-                        )
-                        mophidian.states["markdown_code_highlight_warned"] = True
-                else:
-                    head.insert(
-                        -1,
-                        p(
-                            "link",
-                            {"rel": "stylesheet", "href": url(CONFIG.markdown.pygmentize.path)},
-                        ),
-                    )
-            for node in head_children:
-                node.parent = head
-                exist = '[{}]'
-                exist_equal = '[{}="{}"]'
-                if check(node, "element") and node.tag in ["meta", "title"]:
-                    old_tag = query(
-                        head,
-                        f"{node.tag}{''.join(exist.format(key) for key in node.properties.keys())}",
                     )
-                    if node is not None:
-                        replace_node(head, lambda n, i, p: n == old_tag, node)
-                    else:
-                        head.children.append(node)
-                elif check(node, "element") and node.tag not in ["style", "script"]:
-                    if (
-                        query(
-                            head,
-                            f"{node.tag}\
-{''.join(exist_equal.format(key, value) for key, value in node.properties.items())}",
-                        )
-                        is None
-                    ):
-                        head.children.append(node)
-                else:
-                    # replace or append
-                    head.children.append(node)
-            replace_node(ast.tree, {"tag": "head"}, head)
-
-        replace_node(ast.tree, {"tag": "Slot"}, page_ast.children)
-
-        # Find all components
-        for component in component_files.components():
-            if find(ast, {"tag": component.cname}) is not None:
-                component.link_file(self)
-                self.components.append(component)
+                    mophidian.states["markdown_code_highlight_warned"] = True
+            else:
+                stylesheets.append(
+                    p("link", {"rel": "stylesheet", "href": url(CONFIG.markdown.pygmentize.path)})
+                )
 
-        ast = apply_attribute_configs(ast)
-        ast = phml.compile(**kwargs)
-
-        
-        if CONFIG.build.rss:
-            rss_link = query(ast, "link[type*=rss]")
-            if rss_link is not None:
-                rss_link.properties.update({
-                    "type": "application/rss+xml",
-                    "rel": "alternate",
-                    "href": Path(CONFIG.site.base_url).joinpath(CONFIG.site.root, "feed.xml")
-                })
-
-        # Fix href and src links
-        root = "/" + CONFIG.site.root.strip("/")
-        for link_type in ["href", "src", "xlink:href"]:
-            for node in query_all(ast, f"[{link_type}^=@]"):
-                if not node[link_type].startswith(root):
-                    new_link = node[link_type].lstrip("@").replace('\\', '/').lstrip('/')
-                    node[link_type] = f"{root}/{new_link}"
-        
-        phml.ast = ast
-        return phml.render(**kwargs)
+        return self.compose(phml, ast, page_ast, component_files, stylesheets, **kwargs)
 
     def __repr__(self) -> str:
         next = self.next.relative_url if self.next is not None else "None"
@@ -653,11 +705,12 @@ class Static(File):
     def ast(self) -> AST:
         raise Exception("Static files do not have phml AST's")
 
-    def write(self, dest_dir: str):
+    def write(self, dest_dir: str, mode: str = StaticMode.COPY):
         """Write the static file to it's destination directory.
 
         Args:
             dest_dir: The root dir to place the file into.
+            mode: How the file is placed in the destination. See `StaticMode`.
         """
 
         dest = Path(dest_dir).joinpath(self._dest.strip("/"))
@@ -666,7 +719,31 @@ class Static(File):
         dest.parent.mkdir(parents=True, exist_ok=True)
 
         try:
-            copyfile(original, dest)
+            if dest.exists() and os.path.samefile(original, dest):
+                return
+        except OSError:
+            pass
+
+        # Never write through an existing link into the source file
+        if dest.is_symlink() or dest.exists():
+            dest.unlink()
+
+        try:
+            if mode == StaticMode.SYMLINK:
+                dest.symlink_to(original.resolve())
+                return
+            if mode == StaticMode.HARDLINK:
+                os.link(original, dest)
+                return
+            if mode == StaticMode.REFLINK:
+                reflink(original, dest)
+                return
+        except OSError:
+            # Linking is not supported here so fall back to copying the file
+            dest.unlink(missing_ok=True)
+
+        try:
+            copy2(original, dest)
         except SameFileError:
             pass
 
@@ -690,23 +767,63 @@ class Layout(File, Linker):
             parent = parent.parent
         return list(reversed(lyts))
 
-    def ast(self, **kwargs) -> AST:
-        layouts = self.__fetch_layouts()
-        ast = phml.parse("<Slot/>").ast
+    @staticmethod
+    def invalidate(full_path: str):
+        """Remove all cached layout chains that include the given layout."""
+        full_path = full_path.replace("\\", "/")
+        for key in [key for key in layout_chains if full_path in (path for path, _ in key)]:
+            layout_chains.pop(key, None)
 
-        # Start with <Slot /> element and replace the <Slot /> element with each inherited layout
-        for layout in layouts:
-            layout_ast = phml.load(Path(self.root).joinpath(layout.path.strip("/"))).ast
+    def __chain(self, layouts: list[Layout]) -> tuple[list[dict], str | None]:
+        """The parsed and validated components of the layout chain.
+
+        Chains are cached by the paths and modified times of the layouts in the chain so
+        each layout is only parsed and validated once while it is unchanged.
+
+        Returns:
+            tuple[list[dict], str | None]: The valid components in order and the warning
+                for the first invalid layout if there is one.
+        """
+        paths = [Path(self.root).joinpath(layout.path.strip("/")).as_posix() for layout in layouts]
+        try:
+            key = tuple((path, os.stat(path).st_mtime_ns) for path in paths)
+        except OSError:
+            key = None
+
+        if key is not None and key in layout_chains:
+            return layout_chains[key]
+
+        components, warning = [], None
+        for path in paths:
+            layout_ast = phml.load(path).ast
 
             # If it quacks like a full page, then it's a full page
-            if query(layout_ast, "html") or query(layout_ast, "body"):
-                Logger.warning(f"<{SAIML.parse(f'[@Fgreen]{self.full_path!r}')}> Layout must be a component not a full pages")
-                return ast
+            if not {"html", "body"}.isdisjoint(tag_names(layout_ast)):
+                warning = f"<{SAIML.parse(f'[@Fgreen]{self.full_path!r}')}> Layout must be a component not a full pages"
+                break
 
             component: dict = parse_component(layout_ast)
             if query(component["component"], "Slot") is None:
-                Logger.warning(f"<{SAIML.parse(f'[@Fgreen]*{self.full_path!r}')}> Layout must contain a {SAIML.parse('*<[@F#6305DC]Slot[@F] />')} element")
-                return ast
+                warning = f"<{SAIML.parse(f'[@Fgreen]*{self.full_path!r}')}> Layout must contain a {SAIML.parse('*<[@F#6305DC]Slot[@F] />')} element"
+                break
+            components.append(component)
+
+        if key is not None:
+            layout_chains[key] = (components, warning)
+        return components, warning
+
+    def ast(self, **kwargs) -> AST:
+        components, warning = self.__chain(self.__fetch_layouts())
+        ast = phml.parse("<Slot/>").ast
+
+        # Start with <Slot /> element and replace the <Slot /> element with each inherited layout
+        for component in components:
+            # Each page gets it's own copy of the component's element lists. The component
+            # element itself is deep copied when it is substituted.
+            component = {
+                key: list(value) if isinstance(value, list) else value
+                for key, value in component.items()
+            }
 
             # Replace the <Slot /> element in the parent with the next layout
             substitute_component(
@@ -716,6 +833,9 @@ class Layout(File, Linker):
                 **global_expose,
                 **kwargs
             )
+
+        if warning is not None:
+            Logger.warning(warning)
         return ast
 
     def render(self, page: AST, **kwargs) -> AST:
@@ -1,3 +1,4 @@
+from __future__ import annotations
 import functools
 import os
 from pathlib import Path
@@ -12,6 +13,8 @@ from xml.etree.ElementTree import Element
 
 from saimll import Logger, SAIML
 
+__all__ = ["LinkResolver"]
+
 @functools.lru_cache(maxsize=None)
 def _norm_parts(path: str) -> list[str]:
     if not path.startswith('/'):
@@ -49,32 +52,40 @@ def url_relative_to(current: str, other: str) -> str:
     """Return url for file relative to other file."""
     return get_relative_url(current, other)
 
-class _RelativePathTreeprocessor(Treeprocessor):
+class LinkResolver:
+    """Resolves relative links in a markdown file to the urls of the pages and static files
+    they point to.
+
+    Targets are looked up in the full path, path, and url indexes of the page and static
+    file systems. These are built once when the project is discovered and are kept up to
+    date as files are added and removed, so each link costs a constant time lookup.
+    """
+
     def __init__(self, file, files, statics) -> None:
         self.file = file
         self.files = files
         self.statics = statics
+        self.resolved: dict[str, str | None] = {}
+        """Every target resolved so far and the url it resolved to."""
 
-    def run(self, root: Element) -> Element:
-        """
-        Update urls on anchors and images to make them relative
-        Iterates through the full document tree looking for specific
-        tags and then makes them relative based on the site navigation
-        """
-        for element in root.iter():
-            if element.tag == 'a':
-                key = 'href'
-            elif element.tag == 'img':
-                key = 'src'
-            else:
-                continue
+    def lookup(self, target_uri: str) -> str | None:
+        """Url of the page or static file at the target path. None if there is no such file."""
 
-            url = element.get(key)
-            assert url is not None
-            new_url = self.path_to_url(url)
-            element.set(key, new_url)
+        target_file = self.files.find(target_uri)
+        if target_file is None:
+            target_file = self.statics.find(target_uri)
+        return target_file.relative_url if target_file is not None else None
 
-        return root
+    def resolve(self, target_uri: str) -> str | None:
+        """Lookup the target and remember what it resolved to."""
+
+        if target_uri not in self.resolved:
+            self.resolved[target_uri] = self.lookup(target_uri)
+        return self.resolved[target_uri]
+
+    def is_current(self, resolved: dict[str, str | None]) -> bool:
+        """Check that previously resolved targets still resolve to the same urls."""
+        return all(self.lookup(target) == url for target, url in resolved.items())
 
     def path_to_url(self, url: str) -> str:
         scheme, netloc, path, query, fragment = urlsplit(url)
@@ -98,11 +109,9 @@ class _RelativePathTreeprocessor(Treeprocessor):
         target_uri = posixpath.normpath(target_uri).lstrip('/')
 
         # Validate that the target exists.
-        target_file = self.files.find(target_uri)
-        if target_file is None:
-            target_file = self.statics.find(target_uri)
+        target_url = self.resolve(target_uri)
 
-        if not Path(target_uri).exists() and target_file is None:
+        if target_url is None and not Path(target_uri).exists():
             Logger.debug(
                 f"Page {SAIML.parse(f'[@Fyellow]{SAIML.escape(self.file.relative_url)}[@]')}",
                 "contains a link to",
@@ -112,25 +121,46 @@ class _RelativePathTreeprocessor(Treeprocessor):
             ).flush()
             return url
 
-        if target_file is not None:
-            path = url_relative_to(target_file.relative_url, self.file.relative_url)
+        if target_url is not None:
+            path = url_relative_to(target_url, self.file.relative_url)
         else:
             path = url_relative_to(target_uri, self.file.relative_url)
 
         components = (scheme, netloc, path, query, fragment)
         return urlunsplit(components)
 
+class _RelativePathTreeprocessor(Treeprocessor):
+    def run(self, root: Element) -> Element:
+        """
+        Update urls on anchors and images to make them relative
+        Iterates through the full document tree looking for specific
+        tags and then makes them relative based on the site navigation
+        """
+        links: LinkResolver | None = getattr(self.md, "links", None)
+        if links is None:
+            return root
+
+        for element in root.iter():
+            if element.tag == 'a':
+                key = 'href'
+            elif element.tag == 'img':
+                key = 'src'
+            else:
+                continue
+
+            url = element.get(key)
+            if url is not None:
+                element.set(key, links.path_to_url(url))
+
+        return root
+
 class _RelativePathExtension(Extension):
     """
     The Extension class is what we pass to markdown, it then
-    registers the Treeprocessor.
+    registers the Treeprocessor. Links are resolved with the `LinkResolver` assigned to the
+    markdown instance's `links` attribute for each conversion.
     """
 
-    def __init__(self, file, files, statics) -> None:
-        self.file = file
-        self.files = files
-        self.statics = statics
-
     def extendMarkdown(self, md: Markdown) -> None:
-        relpath = _RelativePathTreeprocessor(self.file, self.files, self.statics)
-        md.treeprocessors.register(relpath, "relpath", 0)
\ No newline at end of file
+        relpath = _RelativePathTreeprocessor(md)
+        md.treeprocessors.register(relpath, "relpath", 0)
@@ -0,0 +1,79 @@
+"""Guard the startup time of the cli.
+
+Imports the cli with `python -X importtime` and fails when it takes longer than the budget or
+when it imports modules that are only needed once a command runs.
+
+Run from the root of the repository:
+
+    python playground/importtime.py [budget in ms]
+"""
+
+import os
+from pathlib import Path
+import subprocess
+import sys
+from tempfile import TemporaryDirectory
+
+BUDGET = 150
+"""Default budget, in milliseconds, for importing the cli."""
+
+DEFERRED = [
+    "tcfg",
+    "phml",
+    "markdown",
+    "pygments",
+    "pymdownx",
+    "watchserver",
+    "saimll",
+    "frontmatter",
+    "mophidian.config",
+    "mophidian.core",
+    "mophidian.file_system",
+]
+"""Modules that must only be imported when a command needs them."""
+
+
+def importtime(module: str) -> dict[str, int]:
+    """Cumulative import time, in microseconds, of every module imported by the module."""
+
+    root = Path(__file__).resolve().parent.parent
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(root), os.environ.get("PYTHONPATH", "")])}
+
+    # Run outside of any project so a `moph.yml` is never found or created
+    with TemporaryDirectory() as cwd:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            cwd=cwd,
+            env=env,
+            check=True,
+        )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+if __name__ == "__main__":
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else BUDGET
+    times = importtime("mophidian.__main__")
+    total = times["mophidian.__main__"] / 1000
+
+    failed = False
+    for name in DEFERRED:
+        imported = [module for module in times if module == name or module.startswith(f"{name}.")]
+        if len(imported) > 0:
+            print(f"{name} is imported at startup")
+            failed = True
+
+    print(f"mophidian.__main__ imported in {total:.1f}ms (budget {budget:.0f}ms)")
+    if total > budget:
+        print("Import time is over budget")
+        failed = True
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,80 @@
+"""Benchmark converting markdown into a phml tree.
+
+Compares serializing python markdown's tree to html and parsing it with phml against
+converting the tree directly. Both approaches start from the same finished tree, so only the
+step from markdown's tree to phml's tree is timed. `tests/test_markdown.py` checks that both
+approaches create the same tree.
+
+Run from the root of the repository:
+
+    python playground/markdown_ast.py [sections] [repeat]
+"""
+
+import sys
+from time import perf_counter
+
+import mophidian.core  # Import the core first to load the config
+from mophidian.core.markdown import ElementTreeConverter, create_markdown
+
+SECTION = """\
+## Section {index}
+
+Some *emphasis*, **strong text**, `inline code`, and a [link](https://example.com/{index}?a=1&b=2).
+Inline <span class="note">raw **html**</span> along with entities &copy; & ampersands.
+The footnote[^{index}] and the abbreviation HTML are expanded.
+
+- [x] Finished task
+- [ ] Open task with <kbd>Ctrl</kbd>
+
+| Name | Value |
+| ---- | ----- |
+| one  | {index} |
+| two  | <em>{index}</em> |
+
+```python
+def section_{index}(value):
+    return value < {index} and value & 1
+```
+
+<div class="raw">
+  <p>Raw block {index}</p>
+</div>
+
+> A quote --- with smart "symbols" (c) 1/2
+
+[^{index}]: The note for section {index}.
+
+"""
+
+
+def document(sections: int) -> str:
+    body = "".join(SECTION.format(index=index) for index in range(sections))
+    return f"# Benchmark\n\n{body}*[HTML]: Hyper Text Markup Language\n"
+
+
+def best(callback, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        callback()
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    sections = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    md = create_markdown()
+    md.links = None
+    content = document(sections)
+    md.convert(content)
+    converter = ElementTreeConverter(md)
+    root = md.tree
+
+    reparse = best(lambda: converter.parse(converter.serialize(root)), repeat)
+    direct = best(lambda: converter.convert(root), repeat)
+
+    print(f"{len(content):,} characters of markdown in {sections} sections")
+    print(f"serialize and parse: {reparse * 1000:.1f}ms")
+    print(f"direct conversion:   {direct * 1000:.1f}ms ({reparse / direct:.1f}x faster)")
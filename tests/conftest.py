@@ -0,0 +1,45 @@
+from pathlib import Path
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+WEBSITE = ROOT.joinpath("website")
+
+
+def run_build(site: Path, *args: str) -> subprocess.CompletedProcess:
+    """Build a project with the cli in it's own process so it loads the project's config."""
+
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(ROOT), os.environ.get("PYTHONPATH", "")])}
+    return subprocess.run(
+        [sys.executable, "-m", "mophidian", "build", *args],
+        cwd=site,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+@pytest.fixture
+def site(tmp_path: Path) -> Path:
+    """A copy of the documentation website without any build output or cache."""
+
+    path = tmp_path.joinpath("website")
+    shutil.copytree(WEBSITE, path, ignore=shutil.ignore_patterns("out", "dist", ".moph-cache"))
+    return path
+
+
+@pytest.fixture
+def project(site: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Run the test from inside a copy of the documentation website.
+
+    The config is loaded from the first project a test runs in. Every copy shares the same
+    `moph.yml` so it stays valid for the copies used by later tests.
+    """
+
+    monkeypatch.chdir(site)
+    return site
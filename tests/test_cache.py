@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from conftest import run_build
+
+
+def edit(path: Path, old: str, new: str):
+    text = path.read_text(encoding="utf-8")
+    assert old in text
+    path.write_text(text.replace(old, new), encoding="utf-8")
+
+
+def test_render_cache_invalidated_by_other_pages_frontmatter(site: Path):
+    run_build(site)
+    blog = site.joinpath("out", "blog", "index.html")
+    assert "release" in blog.read_text(encoding="utf-8")
+
+    # The blog index lists the tags from each post's frontmatter
+    edit(site.joinpath("src", "pages", "blog", "v0.2.0.md"), "'release'", "'changelog'")
+    run_build(site)
+
+    cached = blog.read_text(encoding="utf-8")
+    assert "changelog" in cached
+    assert "release" not in cached
+
+    run_build(site, "--no-cache")
+    assert blog.read_text(encoding="utf-8") == cached
+
+
+def test_render_cache_reuses_unchanged_pages(site: Path):
+    run_build(site)
+    result = run_build(site)
+    assert "render cache:" in result.stdout + result.stderr
+    assert " 0 misses" in result.stdout + result.stderr
+
+
+def test_render_cache_invalidated_by_components(site: Path):
+    run_build(site)
+    edit(site.joinpath("src", "components", "Callout.phml"), "</", "<i>edited</i></")
+    result = run_build(site)
+
+    # Only the page using the component is rendered again
+    assert " 1 misses" in result.stdout + result.stderr
+    assert "<i>edited</i>" in site.joinpath("out", "blog", "v0.2.0", "index.html").read_text(
+        encoding="utf-8"
+    )
+
+
+def test_markdown_cache_reused_after_layout_change(site: Path):
+    run_build(site)
+    edit(site.joinpath("src", "pages", "blog", "layout.phml"), "<Slot", "<p>edited</p><Slot")
+    result = run_build(site)
+
+    output = result.stdout + result.stderr
+    assert "render cache: 3 hits, 3 misses" in output
+    assert "markdown cache: 2 hits, 0 misses" in output
@@ -0,0 +1,102 @@
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def rendered(project: Path):
+    """Every page of the site rendered once and recorded in a dependency graph."""
+
+    from mophidian.core.build import DependencyGraph
+    from mophidian.core.build.render import create_compiler, discover, render_page
+
+    project.joinpath("src", "pages", "docs", "links.md").write_text(
+        "# Links\n\nSee the [style guide](StyleGuide.md) and [a later page](later.md).\n",
+        encoding="utf-8",
+    )
+
+    file_system, nav, public, components = discover()
+    phml = create_compiler(components)
+    graph = DependencyGraph(components)
+    for page in file_system.renderable():
+        render_page(page, phml, file_system, public, components, nav)
+        graph.record(page)
+    return file_system, nav, graph
+
+
+def test_layout_dependents(rendered):
+    from mophidian.core.build import DependencyGraph
+
+    _, _, graph = rendered
+    assert graph.dependents([DependencyGraph.layout("src/pages/blog/layout.phml")]) == {
+        "src/pages/blog/page.phml",
+        "src/pages/blog/reporting_issues.md",
+        "src/pages/blog/v0.2.0.md",
+    }
+
+
+def test_component_dependents(rendered):
+    from mophidian.core.build import DependencyGraph
+
+    _, _, graph = rendered
+    assert graph.dependents([DependencyGraph.component("Callout")]) == {
+        "src/pages/blog/v0.2.0.md"
+    }
+    # Pages depend on tag names even when no component exists for them yet
+    assert graph.dependents([DependencyGraph.component("Missing")]) == set()
+
+
+def test_only_pages_reading_the_nav_depend_on_it(rendered):
+    from mophidian.core.build import DependencyGraph
+
+    file_system, nav, graph = rendered
+    # The blog index lists the pages in the blog section of the nav
+    assert graph.dependents([DependencyGraph.nav("blog")]) == {"src/pages/blog/page.phml"}
+    assert graph.dependents([DependencyGraph.nav()]) == set()
+
+    post = file_system.find("src/pages/blog/v0.2.0.md")
+    assert DependencyGraph.navs(nav, post) == [DependencyGraph.nav(), DependencyGraph.nav("blog")]
+
+
+def test_links(rendered):
+    from mophidian.core.build import DependencyGraph
+
+    file_system, _, graph = rendered
+    guide = file_system.find("src/pages/docs/StyleGuide.md")
+    assert graph.dependents(DependencyGraph.links(guide)) == {"src/pages/docs/links.md"}
+
+    # Links to pages that do not exist yet are recorded so creating the page updates the link
+    assert graph.dependents(["link:docs/later.md"]) == {"src/pages/docs/links.md"}
+
+
+def test_forget(rendered):
+    from mophidian.core.build import DependencyGraph
+
+    file_system, _, graph = rendered
+    count = len(graph)
+    graph.forget(file_system.find("src/pages/blog/page.phml"))
+    assert len(graph) == count - 1
+    assert graph.dependents([DependencyGraph.nav("blog")]) == set()
+
+
+def test_observe_is_per_thread():
+    from threading import Barrier, Thread
+
+    from mophidian.core.build.observe import Observed, observe
+
+    barrier = Barrier(2)
+    accessed = {}
+
+    def read(key: str):
+        with observe() as keys:
+            barrier.wait()
+            str(Observed("value", key))
+            barrier.wait()
+        accessed[key] = keys
+
+    threads = [Thread(target=read, args=(key,)) for key in ("global:a", "global:b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert accessed == {"global:a": {"global:a"}, "global:b": {"global:b"}}
@@ -0,0 +1,39 @@
+from importlib.util import module_from_spec, spec_from_file_location
+import os
+import subprocess
+import sys
+
+from conftest import ROOT
+
+spec = spec_from_file_location("importtime", ROOT.joinpath("playground", "importtime.py"))
+importtime = module_from_spec(spec)
+spec.loader.exec_module(importtime)
+
+
+def imported_modules(module: str, cwd) -> set[str]:
+    """Every module in `sys.modules` after importing the module in a fresh interpreter."""
+
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(ROOT), os.environ.get("PYTHONPATH", "")])}
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys, {module}; print(*sorted(sys.modules), sep='\\n')"],
+        capture_output=True,
+        text=True,
+        cwd=cwd,
+        env=env,
+        check=True,
+    )
+    return set(result.stdout.split())
+
+
+def test_cli_defers_heavy_imports(tmp_path):
+    # Run outside of any project so a `moph.yml` is never found or created
+    modules = imported_modules("mophidian.__main__", tmp_path)
+    assert "mophidian.__main__" in modules
+
+    imported = sorted(
+        module
+        for module in modules
+        for name in importtime.DEFERRED
+        if module == name or module.startswith(f"{name}.")
+    )
+    assert imported == []
@@ -0,0 +1,121 @@
+from pathlib import Path
+
+import pytest
+
+SAMPLES = [
+    "# Heading\n\nSome *emphasis*, **strong**, `code`, and a [link](https://example.com/?a=1&b=2).",
+    "Inline <span class=\"note\">raw **html**</span> with entities &copy; & ampersands.",
+    "A footnote[^1] and an abbreviation HTML.\n\n[^1]: The note.\n\n*[HTML]: Hyper Text Markup Language",
+    "- [x] Finished task\n- [ ] Open task with <kbd>Ctrl</kbd>",
+    "| Name | Value |\n| ---- | ----- |\n| one  | <em>1</em> |",
+    "```python\ndef section(value):\n    return value < 1 and value & 1\n```",
+    "<div class=\"raw\">\n  <p>Raw block</p>\n</div>\n\n> A quote --- with \"symbols\" (c) 1/2",
+    "Inline <b>html</b>\n\n<!-- a comment -->\n\n<img src=\"a.png\" alt='x'>",
+    "<p>\n\nLine break  \nand <br> and <hr/>",
+]
+
+
+@pytest.fixture
+def markdown(project: Path):
+    from mophidian.core.markdown import create_markdown
+
+    md = create_markdown()
+    md.links = None
+    return md
+
+
+def markdown_files(project: Path) -> list[Path]:
+    """The markdown pages of the website and of the preset project."""
+
+    preset = Path(__file__).resolve().parent.parent.joinpath("mophidian", "presets", "default")
+    files = [
+        *sorted(project.joinpath("src").glob("**/*.md")),
+        *sorted(preset.joinpath("src").glob("**/*.md")),
+    ]
+    assert len(files) > 1
+    return files
+
+
+def convert_both(md, content: str) -> tuple[list, list]:
+    """The tree converted directly and the tree from parsing the serialized html."""
+
+    from mophidian.core.markdown import ElementTreeConverter, dump_tree
+
+    md.reset()
+    md.links = None
+    md.convert(content)
+    converter = ElementTreeConverter(md)
+    direct = dump_tree(converter.convert(md.tree))
+    reparsed = dump_tree(converter.parse(converter.serialize(md.tree)))
+    return direct, reparsed
+
+
+@pytest.mark.parametrize("content", SAMPLES)
+def test_direct_conversion_matches_parsing(markdown, content: str):
+    direct, reparsed = convert_both(markdown, content)
+    assert direct == reparsed
+
+
+def test_direct_conversion_matches_parsing_for_site(markdown, project: Path):
+    import frontmatter
+
+    for file in markdown_files(project):
+        content = frontmatter.loads(file.read_text(encoding="utf-8")).content
+        direct, reparsed = convert_both(markdown, content)
+        assert direct == reparsed, file.name
+
+
+def test_highlighter_is_scoped_to_mophidian_converters(project: Path):
+    from markdown import Markdown
+
+    from mophidian.core.markdown import HIGHLIGHTER, MARKDOWN_POOL
+
+    code = "```python\nprint('scoped')\n```"
+    MARKDOWN_POOL.convert(code)
+    MARKDOWN_POOL.convert(code)
+    assert HIGHLIGHTER.memory_hits > 0
+
+    # Other converters in the process highlight with pygments directly
+    memory, hits = dict(HIGHLIGHTER._memory), HIGHLIGHTER.memory_hits
+    other = Markdown(extensions=["fenced_code", "codehilite"])
+    assert "scoped" in other.convert("```python\nprint('scoped')\n```\n\n```js\nlet other;\n```")
+    assert HIGHLIGHTER._memory == memory
+    assert HIGHLIGHTER.memory_hits == hits
+
+
+def test_copied_rules_match_dependencies(markdown):
+    from mophidian.core.markdown import ElementTreeConverter
+
+    # The copied parsing and escaping rules no longer match phml or python markdown when this
+    # fails. Conversions are still correct, but always serialize and parse.
+    assert ElementTreeConverter(markdown).direct
+
+
+def test_conversion_matches_parsing_markdown_output(markdown, project: Path):
+    import frontmatter
+    from markdown import Markdown
+    from phml import PHML
+
+    from mophidian.config import CONFIG
+    from mophidian.core.markdown import dump_tree, to_tree
+    from mophidian.file_system.markdown_extensions import _RelativePathExtension
+
+    # Converting markdown to html then parsing it with phml, as pages were originally rendered
+    original = Markdown(
+        extensions=[*CONFIG.markdown.extensions, _RelativePathExtension()],
+        extension_configs=CONFIG.markdown.extension_configs,
+    )
+    original.links = None
+
+    sources = [
+        *SAMPLES,
+        *(
+            frontmatter.loads(file.read_text(encoding="utf-8")).content
+            for file in markdown_files(project)
+        ),
+    ]
+    for content in sources:
+        markdown.reset()
+        markdown.links = None
+        expected = dump_tree(PHML().parse(original.reset().convert(content)).ast.tree)
+        assert dump_tree(to_tree(markdown, content)) == expected, content[:40]
@@ -0,0 +1,80 @@
+from pathlib import Path
+import re
+
+from conftest import run_build
+
+
+def test_config_attributes_are_compiled(site: Path):
+    config = site.joinpath("moph.yml")
+    config.write_text(
+        config.read_text(encoding="utf-8").replace(
+            "build:\n",
+            "build:\n  html:\n    lang: en\n    ':data-title': title\n  body:\n    class: [dark, wide]\n",
+            1,
+        ),
+        encoding="utf-8",
+    )
+    run_build(site)
+
+    page = site.joinpath("out", "docs", "index.html").read_text(encoding="utf-8")
+    html = re.search(r"<html[^>]*>", page).group(0)
+    assert 'lang="en"' in html
+    # Expressions in the config attributes are evaluated with the page variables
+    assert ":data-title" not in html
+    assert re.search(r'\sdata-title="(?!title")[^"]+"', html) is not None
+    assert re.search(r'<body[^>]*class="dark wide"', page) is not None
+
+
+def read_output(out: Path) -> dict[str, bytes]:
+    return {
+        path.relative_to(out).as_posix(): path.read_bytes()
+        for path in sorted(out.rglob("*"))
+        if path.is_file()
+    }
+
+
+def test_parallel_render_matches_serial(site: Path):
+    out = site.joinpath("out")
+    run_build(site, "--jobs", "1", "--no-cache")
+    serial = read_output(out)
+
+    run_build(site, "--jobs", "2", "--no-cache", "--dirty")
+    parallel = read_output(out)
+
+    assert len(serial) > 0
+    assert parallel.keys() == serial.keys()
+    for key, content in serial.items():
+        assert parallel[key] == content, key
+
+
+def test_manifest_is_kept_out_of_the_output(site: Path):
+    run_build(site)
+    assert not any(path.name.startswith(".moph") for path in site.joinpath("out").rglob("*"))
+    assert site.joinpath(".moph-cache", "manifest-out.json").is_file()
+
+    # The manifest still detects the unchanged output
+    result = run_build(site, "--debug")
+    assert "0 changed files" in result.stdout + result.stderr
+
+
+def test_static_files_are_hashed_only_when_needed(site: Path):
+    import json
+    import os
+
+    manifest = site.joinpath(".moph-cache", "manifest-out.json")
+    run_build(site)
+    entries = json.loads(manifest.read_text(encoding="utf-8"))["files"]
+    assert entries["global.css"]["hash"] is None
+
+    # A new modified time with the same size can only be decided by the content
+    source = site.joinpath("public", "global.css")
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    run_build(site)
+    entries = json.loads(manifest.read_text(encoding="utf-8"))["files"]
+    assert entries["global.css"]["hash"] is not None
+
+    content = source.read_bytes()
+    source.write_bytes(content.replace(b"{", b"[", 1))
+    run_build(site)
+    assert site.joinpath("out", "global.css").read_bytes() == source.read_bytes()
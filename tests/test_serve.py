@@ -0,0 +1,187 @@
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def callbacks(project: Path):
+    from mophidian.core import Callbacks
+
+    return Callbacks(delay=60)
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "src/pages/docs/.README.md.swp",
+        "src/pages/docs/README.md~",
+        "src/components/.#Callout.phml",
+        "public/node_modules/script.js",
+    ],
+)
+def test_ignored_events_are_dropped(callbacks, path: str):
+    callbacks.queue(path)
+    assert len(callbacks._events) == 0
+
+
+def test_events_are_queued(callbacks):
+    callbacks.queue("src/pages/docs/README.md")
+    assert callbacks._events == {"src/pages/docs/README.md"}
+
+
+def rebuild(callbacks, *paths: str) -> set[str]:
+    """Queue file events, render the batch, and collect the urls that were reloaded."""
+
+    from queue import Queue
+
+    callbacks.reloads = Queue()
+    for path in paths:
+        callbacks.queue(path)
+    callbacks.flush()
+    callbacks.wait()
+    return {str(callbacks.reloads.get()) for _ in range(callbacks.reloads.qsize())}
+
+
+def edit(path: Path, old: str, new: str):
+    text = path.read_text(encoding="utf-8")
+    assert old in text
+    path.write_text(text.replace(old, new), encoding="utf-8")
+
+
+def test_frontmatter_change_renders_nav_readers(callbacks, project: Path):
+    post = "src/pages/blog/v0.2.0.md"
+    edit(project.joinpath(post), "'release'", "'changelog'")
+
+    # The blog index lists the tags of each post
+    assert rebuild(callbacks, post) == {"Mophidian/blog/", "Mophidian/blog/v0.2.0/"}
+    blog = project.joinpath("dist", "Mophidian", "blog", "index.html").read_text(encoding="utf-8")
+    assert "changelog" in blog
+
+
+def test_batch_delay_defaults_to_a_short_window(project: Path):
+    from queue import Queue
+    from time import sleep
+
+    from mophidian.core import Callbacks
+
+    callbacks = Callbacks()
+    assert callbacks.delay < 0.5
+
+    callbacks.reloads = Queue()
+    edit(project.joinpath("src", "pages", "docs", "StyleGuide.md"), "\n", "\n\nAdded text.\n\n")
+    callbacks.queue("src/pages/docs/StyleGuide.md")
+    sleep(callbacks.delay + 1)
+    callbacks.wait()
+    assert str(callbacks.reloads.get_nowait()) == "Mophidian/docs/StyleGuide/"
+
+
+def test_events_are_batched(callbacks, project: Path):
+    guide = "src/pages/docs/StyleGuide.md"
+    edit(project.joinpath(guide), "\n", "\n\nFirst edit.\n\n")
+    callbacks.queue(guide)
+    edit(project.joinpath(guide), "First edit.", "Second edit.")
+    callbacks.queue(guide)
+
+    # A file created and removed in the same batch is never rendered
+    temporary = project.joinpath("src", "pages", "docs", "temporary.md")
+    temporary.write_text("# Temporary\n", encoding="utf-8")
+    callbacks.queue("src/pages/docs/temporary.md")
+    temporary.unlink()
+
+    component = "src/components/Callout.phml"
+    edit(project.joinpath(component), "</", "<i>edited</i></")
+
+    assert rebuild(callbacks, "src/pages/docs/temporary.md", component) == {
+        "Mophidian/docs/StyleGuide/",
+        "Mophidian/blog/v0.2.0/",
+    }
+    dist = project.joinpath("dist", "Mophidian")
+    assert "Second edit." in dist.joinpath("docs", "StyleGuide", "index.html").read_text(
+        encoding="utf-8"
+    )
+    assert not dist.joinpath("docs", "temporary").exists()
+
+
+def test_failed_rebuild_is_retried(callbacks, project: Path, monkeypatch):
+    apply = callbacks.apply
+
+    def fail(changes):
+        monkeypatch.setattr(callbacks, "apply", apply)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(callbacks, "apply", fail)
+    guide = "src/pages/docs/StyleGuide.md"
+    edit(project.joinpath(guide), "\n", "\n\nAdded text.\n\n")
+    assert rebuild(callbacks, guide) == set()
+    assert callbacks._pending is not None
+
+    # The failed changes are rendered with the next batch
+    readme = "src/pages/docs/README.md"
+    edit(project.joinpath(readme), "\n", "\n\nAdded text.\n\n")
+    assert rebuild(callbacks, readme) == {"Mophidian/docs/StyleGuide/", "Mophidian/docs/"}
+    assert callbacks._pending is None
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Full paths of the pages rendered. Set `cancel_after` to cancel the render after that
+    many pages.
+    """
+
+    from mophidian.core.build import render
+
+    render_page = render.render_page
+    record = {"pages": [], "cancel": None, "cancel_after": None}
+
+    def counted(page, *args):
+        output = render_page(page, *args)
+        record["pages"].append(page.full_path)
+        if record["cancel_after"] is not None and len(record["pages"]) >= record["cancel_after"]:
+            record["cancel"].set()
+        return output
+
+    monkeypatch.setattr(render, "render_page", counted)
+    return record
+
+
+def test_cancelled_render_keeps_unaffected_pages(callbacks, project: Path, renders):
+    renders["cancel"] = callbacks._cancel
+    renders["cancel_after"] = 2
+
+    dist = project.joinpath("dist", "Mophidian", "docs")
+    edit(project.joinpath("src", "pages", "docs", "layout.phml"), "<Slot", "<p>edited</p><Slot")
+    assert callbacks.rebuild({"src/pages/docs/layout.phml"}) == []
+    assert "edited" not in dist.joinpath("index.html").read_text(encoding="utf-8")
+    assert len(callbacks._finished) == 2
+
+    # Only the page changed by the newer batch is rendered again
+    renders.update(pages=[], cancel_after=None)
+    callbacks._cancel.clear()
+    guide = "src/pages/docs/StyleGuide.md"
+    edit(project.joinpath(guide), "\n", "\n\nAdded text.\n\n")
+    assert set(callbacks.rebuild({guide})) == {"Mophidian/docs/", "Mophidian/docs/StyleGuide/"}
+    assert renders["pages"] == [guide]
+    assert callbacks._finished == {}
+
+    assert "edited" in dist.joinpath("index.html").read_text(encoding="utf-8")
+    styleguide = dist.joinpath("StyleGuide", "index.html").read_text(encoding="utf-8")
+    assert "edited" in styleguide and "Added text." in styleguide
+
+
+def test_cancelled_render_defers_static_files(callbacks, project: Path, renders):
+    renders["cancel"] = callbacks._cancel
+    renders["cancel_after"] = 1
+
+    css = project.joinpath("public", "global.css")
+    css.write_text(css.read_text(encoding="utf-8") + "\n.edited {}\n", encoding="utf-8")
+    edit(project.joinpath("src", "pages", "docs", "layout.phml"), "<Slot", "<p>edited</p><Slot")
+    events = {"public/global.css", "src/pages/docs/layout.phml"}
+    assert callbacks.rebuild(events) == []
+
+    written = project.joinpath("dist", "Mophidian", "global.css")
+    assert ".edited" not in written.read_text(encoding="utf-8")
+
+    renders["cancel_after"] = None
+    callbacks._cancel.clear()
+    assert callbacks.rebuild(set())[0] == "**"
+    assert ".edited" in written.read_text(encoding="utf-8")